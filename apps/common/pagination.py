@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -12,4 +12,21 @@ class DefaultPagination(PageNumberPagination):
             "next": self.get_next_link(),
             "previous": self.get_previous_link(),
             "results": data,
-        })
\ No newline at end of file
+        })
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over newest-first rows. Unlike page numbers it never OFFSETs,
+    so deep pages cost the same as the first one; there is no total count.
+    """
+    ordering = "-created_at"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
@@ -113,7 +113,7 @@ def get_organization_from_request(request, org_id=None):
 
     # Fallback to user membership
     if hasattr(request.user, 'memberships'):
-        membership = request.user.memberships.first()
+        membership = request.user.memberships.select_related('organization').first()
         if membership:
             return membership.organization
     return None
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ZohoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.module.zoho'
+
+    def ready(self):
+        """Register the app's system checks when Django starts up."""
+        from . import checks  # noqa: F401
+        return super().ready()
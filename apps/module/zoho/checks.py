@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Placeholder default from config/settings/base.py when OPENAI_API_KEY is not set
+_PLACEHOLDER_OPENAI_API_KEY = "your_openai_api_key_here"
+
+
+@register()
+def check_openai_api_key(app_configs, **kwargs):
+    """Report a missing OpenAI key at startup instead of on the first bill analysis."""
+    api_key = getattr(settings, 'OPENAI_API_KEY', None)
+    if api_key and api_key != _PLACEHOLDER_OPENAI_API_KEY:
+        return []
+    return [
+        Warning(
+            "OPENAI_API_KEY is not configured; bill analysis requests will fail.",
+            hint="Set the OPENAI_API_KEY environment variable.",
+            id="zoho.W001",
+        )
+    ]
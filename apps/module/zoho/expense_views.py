@@ -1,19 +1,13 @@
-import base64
 import json
 import logging
 import os
+import tempfile
 from datetime import datetime
-from io import BytesIO
 
 import requests
-from PyPDF2 import PdfReader
-from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files import File
 from django.db import transaction
-from django.db.models.functions import Lower
-from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema
-from openai import OpenAI
 from pdf2image import convert_from_bytes
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
@@ -22,7 +16,6 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from apps.common.pagination import DefaultPagination
-from apps.organizations.models import Organization
 from .models import (
     ZohoCredentials,
     ZohoVendor,
@@ -39,6 +32,23 @@ from .serializers.expense_bills import (
     ExpenseZohoBillSerializer,
     ZohoExpenseBillMultipleUploadSerializer,
 )
+from .vendor_views import get_organization_from_request
+from .utils import (
+    BILL_BULK_CREATE_BATCH_SIZE,
+    OPENAI_MAX_IMAGE_EDGE,
+    PDF_RENDER_THREADS,
+    ZOHO_API_SESSION,
+    ZOHO_API_TIMEOUT,
+    delete_bill_file_on_commit,
+    discard_stored_bill_files,
+    encode_image_for_openai,
+    ensure_budgeted_image,
+    get_zoho_access_token,
+    openai_client,
+    raise_for_zoho_status,
+    refresh_zoho_access_token,
+    zoho_response_body,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,34 +57,11 @@ logger = logging.getLogger(__name__)
 # Helper Functions
 # ============================================================================
 
-def get_organization_from_request(request, **kwargs):
-    """Get organization from URL org_id parameter, API key, or user membership."""
-    # First check for org_id in URL kwargs (organization-scoped endpoints)
-    org_id = kwargs.get('org_id')
-    if org_id:
-        return get_object_or_404(Organization, id=org_id)
-
-    # Check for API key authentication
-    if hasattr(request, 'auth') and request.auth:
-        from apps.organizations.models import OrganizationAPIKey
-        try:
-            org_api_key = OrganizationAPIKey.objects.get(api_key=request.auth)
-            return org_api_key.organization
-        except OrganizationAPIKey.DoesNotExist:
-            pass
-
-    # Fallback to user membership
-    if hasattr(request.user, 'memberships'):
-        membership = request.user.memberships.filter(is_active=True).first()
-        if membership:
-            return membership.organization
-    return None
-
-
 def get_zoho_credentials(organization):
     """Get valid Zoho credentials for organization."""
     try:
-        credentials = ZohoCredentials.objects.get(organization=organization)
+        # Cached until the credentials are saved or deleted, so a sync costs no lookup query
+        credentials = ZohoCredentials.for_organization(organization)
         if not credentials.is_token_valid():
             if not credentials.refresh_token():
                 raise ValueError("Unable to refresh Zoho token")
@@ -94,14 +81,16 @@ def make_zoho_api_request(credentials, endpoint, method='GET', data=None):
 
     try:
         if method == 'GET':
-            response = requests.get(url, headers=headers)
+            response = ZOHO_API_SESSION.get(url, headers=headers, timeout=ZOHO_API_TIMEOUT)
         elif method == 'POST':
-            response = requests.post(url, headers=headers, json=data)
+            response = ZOHO_API_SESSION.post(url, headers=headers, json=data, timeout=ZOHO_API_TIMEOUT)
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
 
-        response.raise_for_status()
-        return response.json()
+        # Decode the body once; on failure it carries Zoho's message into the raised error
+        body = zoho_response_body(response)
+        raise_for_zoho_status(response, body)
+        return body
     except requests.RequestException as e:
         logger.error(f"Zoho API request failed: {str(e)}")
         raise
@@ -115,12 +104,7 @@ def analyze_bill_with_openai(file_content, file_extension):
     logger.info(f"Starting enhanced journal bill analysis for file type: {file_extension}")
 
     try:
-        # Initialize OpenAI client
-        api_key = getattr(settings, 'OPENAI_API_KEY', None)
-        if not api_key:
-            raise ValueError("OpenAI API key not configured in settings")
-
-        client = OpenAI(api_key=api_key)
+        client = openai_client()
 
         # Prepare image data based on file type with enhanced processing
         if file_extension.lower() == 'pdf':
@@ -140,21 +124,24 @@ def analyze_bill_with_openai(file_content, file_extension):
 
             # Convert PDF to image with enhanced settings
             try:
-                from PIL import Image, ImageEnhance
+                from PIL import ImageEnhance
 
                 logger.info("Converting PDF to image with enhanced settings...")
+                # pdftoppm renders the page straight at the target size (long edge),
+                # so no oversized bitmap is allocated and then shrunk
                 images = convert_from_bytes(
                     file_content,
                     first_page=1,
                     last_page=1,
-                    dpi=200,  # Good balance of quality vs speed
-                    fmt='jpeg'
+                    fmt='jpeg',
+                    size=OPENAI_MAX_IMAGE_EDGE
                 )
 
                 if not images:
                     raise ValueError("No images generated from PDF")
 
                 image = images[0]
+                del images
                 logger.info(f"PDF converted successfully - Image size: {image.size}, Mode: {image.mode}")
 
                 # Enhanced image optimization for OCR
@@ -171,20 +158,11 @@ def analyze_bill_with_openai(file_content, file_extension):
                 enhancer = ImageEnhance.Sharpness(image)
                 image = enhancer.enhance(1.1)
 
-                # Ensure minimum size for better OCR accuracy
-                width, height = image.size
-                if width < 1000 or height < 1000:
-                    scale = max(1000 / width, 1000 / height)
-                    new_size = (int(width * scale), int(height * scale))
-                    image = image.resize(new_size, Image.Resampling.LANCZOS)
-                    logger.info(f"Image upscaled to: {new_size}")
-
                 logger.info("Image optimization completed")
 
-                # Convert PIL image to base64
-                buffer = BytesIO()
-                image.save(buffer, format='JPEG', quality=95)
-                image_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
+                # Convert PIL image to base64, releasing the bitmap before the API call
+                image_data = encode_image_for_openai(image)
+                image.close()
                 mime_type = "image/jpeg"
                 logger.info(f"Base64 conversion completed: {len(image_data):,} characters")
 
@@ -196,14 +174,8 @@ def analyze_bill_with_openai(file_content, file_extension):
             # Handle image files with MIME type detection
             logger.info(f"Processing image file: {file_extension}")
 
-            if file_extension.lower() in ['jpg', 'jpeg']:
-                mime_type = "image/jpeg"
-            elif file_extension.lower() == 'png':
-                mime_type = "image/png"
-            else:
-                mime_type = "image/jpeg"  # Default fallback
-
-            image_data = base64.b64encode(file_content).decode('utf-8')
+            # Oversized uploads are re-encoded as bounded JPEG; small ones pass through
+            image_data, mime_type = ensure_budgeted_image(file_content)
             logger.info(f"Successfully processed image with MIME type: {mime_type}")
 
         else:
@@ -257,6 +229,11 @@ def analyze_bill_with_openai(file_content, file_extension):
         }
         """
 
+        # The data URL is the only copy the request needs; drop the raw upload and
+        # the standalone base64 string so they are not held during the API call
+        image_url = f"data:{mime_type};base64,{image_data}"
+        del file_content, image_data
+
         # Enhanced OpenAI API call with better settings
         logger.info("Sending request to OpenAI API...")
         response = client.chat.completions.create(
@@ -272,7 +249,7 @@ def analyze_bill_with_openai(file_content, file_extension):
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:{mime_type};base64,{image_data}",
+                            "url": image_url,
                             "detail": "high"  # Enhanced detail setting
                         }
                     }
@@ -286,10 +263,11 @@ def analyze_bill_with_openai(file_content, file_extension):
             raise ValueError("Empty response from OpenAI API")
 
         logger.info("Successfully received response from OpenAI API")
-        logger.info(f"Raw OpenAI response: {response.choices[0].message.content}")
+        # Debug only and formatted lazily: the full payload is large and rarely needed
+        logger.debug("Raw OpenAI response: %s", response.choices[0].message.content)
 
         json_data = json.loads(response.choices[0].message.content)
-        logger.info(f"Successfully parsed analyzed data: {json_data}")
+        logger.debug("Successfully parsed analyzed data: %s", json_data)
         return json_data
 
     except Exception as e:
@@ -337,8 +315,7 @@ def create_expense_zoho_objects_from_analysis(bill, analyzed_data, organization)
     vendor = None
     company_name = relevant_data.get('to', {}).get('name', '').strip().lower()
     if company_name:
-        vendor = ZohoVendor.objects.annotate(lower_name=Lower('companyName')).filter(
-            lower_name=company_name).first()
+        vendor = ZohoVendor.lookup_by_name(organization, company_name)
         logger.info(f"Found vendor by name {company_name}: {vendor}")
 
     # Parse dates
@@ -394,26 +371,24 @@ def create_expense_zoho_objects_from_analysis(bill, analyzed_data, organization)
             logger.info(f"Created new ExpenseZohoBill: {zoho_bill.id}")
         else:
             logger.info(f"Found existing ExpenseZohoBill: {zoho_bill.id}")
-            # Update the existing bill with new analyzed data
-            zoho_bill.vendor = vendor
-            zoho_bill.bill_no = relevant_data.get('invoiceNumber', zoho_bill.bill_no)
-            zoho_bill.bill_date = bill_date or zoho_bill.bill_date
-            zoho_bill.due_date = due_date or zoho_bill.due_date
-            zoho_bill.total = safe_numeric_string(relevant_data.get('total'), zoho_bill.total)
-            zoho_bill.igst = safe_numeric_string(relevant_data.get('igst'), zoho_bill.igst)
-            zoho_bill.cgst = safe_numeric_string(relevant_data.get('cgst'), zoho_bill.cgst)
-            zoho_bill.sgst = safe_numeric_string(relevant_data.get('sgst'), zoho_bill.sgst)
-            zoho_bill.note = f"Updated from analysis for {company_name or 'Unknown Vendor'}"
-            zoho_bill.save()
+            # Update only the analysed columns of the existing bill in a single UPDATE
+            updates = {
+                'vendor': vendor,
+                'bill_no': relevant_data.get('invoiceNumber', zoho_bill.bill_no),
+                'bill_date': bill_date or zoho_bill.bill_date,
+                'due_date': due_date or zoho_bill.due_date,
+                'total': safe_numeric_string(relevant_data.get('total'), zoho_bill.total),
+                'igst': safe_numeric_string(relevant_data.get('igst'), zoho_bill.igst),
+                'cgst': safe_numeric_string(relevant_data.get('cgst'), zoho_bill.cgst),
+                'sgst': safe_numeric_string(relevant_data.get('sgst'), zoho_bill.sgst),
+                'note': f"Updated from analysis for {company_name or 'Unknown Vendor'}",
+            }
+            ExpenseZohoBill.objects.filter(pk=zoho_bill.pk).update(**updates)
+            for field, value in updates.items():
+                setattr(zoho_bill, field, value)
             logger.info(f"Updated existing ExpenseZohoBill: {zoho_bill.id}")
 
-        # Delete existing products and recreate them
-        existing_products_count = zoho_bill.products.count()
-        if existing_products_count > 0:
-            zoho_bill.products.all().delete()
-            logger.info(f"Deleted {existing_products_count} existing products")
-
-        # Create ExpenseZohoProduct objects for each item
+        # Build ExpenseZohoProduct objects for each item
         items = relevant_data.get('items', [])
         logger.info(f"Creating {len(items)} product line items")
 
@@ -421,18 +396,23 @@ def create_expense_zoho_objects_from_analysis(bill, analyzed_data, organization)
         for idx, item in enumerate(items):
             try:
                 amount = item.get('price', 0) * item.get('quantity', 1)
-                product = ExpenseZohoProduct.objects.create(
+                created_products.append(ExpenseZohoProduct(
                     zohoBill=zoho_bill,
                     organization=organization,
                     item_details=item.get('description', f'Item {idx + 1}')[:200],
                     amount=safe_numeric_string(amount)
-                )
-                created_products.append(product)
-                logger.info(f"Created product {idx + 1}: {product.item_details} - Amount: {product.amount}")
+                ))
             except Exception as e:
                 logger.error(f"Error creating product {idx + 1}: {str(e)}")
                 continue
 
+        # Replace the existing products with one DELETE and one multi-row INSERT
+        with transaction.atomic():
+            deleted_count, _ = zoho_bill.products.all().delete()
+            ExpenseZohoProduct.objects.bulk_create(created_products, batch_size=500)
+        if deleted_count:
+            logger.info(f"Deleted {deleted_count} existing products")
+
         logger.info(f"Successfully created {len(created_products)} products for bill {zoho_bill.id}")
         return zoho_bill
 
@@ -448,66 +428,49 @@ def process_pdf_splitting_expense(pdf_file, organization, file_type, uploaded_by
     try:
         pdf_file.seek(0)
         pdf_bytes = pdf_file.read()
-        pdf = PdfReader(BytesIO(pdf_bytes))
         unique_id = datetime.now().strftime("%Y%m%d%H%M%S")
 
-        for page_num in range(len(pdf.pages)):
-            # Convert PDF page to image
-            page_images = convert_from_bytes(
+        # Rasterise every page in a single poppler run, written straight to JPEG files,
+        # instead of counting pages with PyPDF2 and re-parsing the PDF for each page
+        with tempfile.TemporaryDirectory() as output_folder:
+            page_paths = convert_from_bytes(
                 pdf_bytes,
-                first_page=page_num + 1,
-                last_page=page_num + 1
+                fmt='jpeg',
+                output_folder=output_folder,
+                paths_only=True,
+                thread_count=PDF_RENDER_THREADS
             )
 
-            if page_images:
-                image_io = BytesIO()
-                page_images[0].save(image_io, format='JPEG')
-                image_io.seek(0)
-
-                # Create bill for this page with uploaded_by user
-                # Let the model generate billmunshiName automatically
-                bill = ExpenseBill.objects.create(
-                    file=ContentFile(
-                        image_io.read(),
-                        name=f"BM-Expense-Page-{page_num + 1}-{unique_id}.jpg"
-                    ),
+            for page_num, page_path in enumerate(page_paths):
+                # Store the page file now; the bill rows are numbered and inserted together below
+                bill = ExpenseBill(
                     fileType=file_type,
                     status='Draft',
                     organization=organization,
                     uploaded_by=uploaded_by
                 )
+                # Stream the rendered page into storage instead of reading it into memory first
+                with open(page_path, 'rb') as page_image:
+                    bill.file.save(f"BM-Expense-Page-{page_num + 1}-{unique_id}.jpg", File(page_image), save=False)
                 created_bills.append(bill)
 
+        # The organization row stays locked until the rows are in, so concurrent
+        # uploads cannot hand out the same names
+        with transaction.atomic():
+            names = ExpenseBill.generate_billmunshi_names(organization, len(created_bills))
+            for bill, name in zip(created_bills, names):
+                bill.billmunshiName = name
+            ExpenseBill.objects.bulk_create(created_bills, batch_size=BILL_BULK_CREATE_BATCH_SIZE)
+
     except Exception as e:
+        # The rows were rolled back, so remove the page files already stored for them
+        discard_stored_bill_files(created_bills)
         logger.error(f"Error splitting Expense PDF: {str(e)}")
         raise Exception(f"Expense PDF processing failed: {str(e)}")
 
     return created_bills
 
 
-def refresh_zoho_access_token(current_token):
-    """Refresh Zoho access token using refresh token."""
-    refresh_token = current_token.refreshToken
-    client_id = current_token.clientId
-    client_secret = current_token.clientSecret
-
-    url = f"https://accounts.zoho.in/oauth/v2/token?refresh_token={refresh_token}&client_id={client_id}&client_secret={client_secret}&grant_type=refresh_token"
-
-    try:
-        response = requests.post(url)
-        if response.status_code == 200:
-            new_access_token = response.json().get('access_token')
-            current_token.accessToken = new_access_token
-            current_token.save()
-            return new_access_token
-        else:
-            logger.error(f"Failed to refresh token: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        logger.error(f"Error refreshing token: {str(e)}")
-        return None
-
-
 # ============================================================================
 # Expense Bills API Views
 # ============================================================================
@@ -537,7 +500,13 @@ def expense_bills_list_view(request, org_id):
     elif status_param == 'synced':
         bills = bills.filter(status='Synced')
 
-    bills = bills.order_by('-created_at')
+    # The list serializer renders the uploader for every bill; join it so a page costs one query,
+    # and load only the columns it reads so analysed_data never leaves the database
+    bills = bills.select_related('uploaded_by').only(
+        'id', 'billmunshiName', 'file', 'fileType', 'status', 'process', 'created_at', 'update_at',
+        'uploaded_by__id', 'uploaded_by__username', 'uploaded_by__first_name',
+        'uploaded_by__last_name', 'uploaded_by__email'
+    ).order_by('-created_at')
 
     # Apply pagination
     paginator = DefaultPagination()
@@ -567,34 +536,10 @@ def expense_bills_list_view(request, org_id):
 def expense_bill_upload_view(request, org_id):
     """Handle single or multiple expense bill file uploads with PDF splitting support"""
 
-    # Handle both single file and multiple files seamlessly
-    files_data = []
-
-    # Debug logging with prints (will show in gunicorn logs)
-    print(f"[Expense DEBUG] Request data keys: {list(request.data.keys())}")
-    print(f"[Expense DEBUG] 'files' in request.data: {'files' in request.data}")
-    print(f"[Expense DEBUG] 'file' in request.data: {'file' in request.data}")
-
-    # Check if files are provided as a list (multiple files)
-    if 'files' in request.data:
-        files_data = request.data.getlist('files') if hasattr(request.data, 'getlist') else request.data.get('files',
-                                                                                                             [])
-        # Ensure files_data is always a list
-        if not isinstance(files_data, list):
-            files_data = [files_data] if files_data else []
-        print(f"[Expense DEBUG] Found 'files' field with {len(files_data)} file(s)")
-    # Check if a single file is provided
-    elif 'file' in request.data:
-        single_file = request.data.get('file')
-        if single_file:
-            files_data = [single_file]
-        print(f"[Expense DEBUG] Found 'file' field with {len(files_data)} file(s)")
-
-    print(f"[Expense DEBUG] Total files collected: {len(files_data)}")
-
-    # Debug: Print details about each file
-    for i, f in enumerate(files_data):
-        print(f"[journal DEBUG] File {i + 1}: {getattr(f, 'name', 'Unknown')} - Size: {getattr(f, 'size', 'Unknown')}")
+    # Uploaded files always live in request.FILES, whose getlist() returns a list
+    files_data = request.FILES.getlist('files') or (
+        [request.FILES['file']] if 'file' in request.FILES else []
+    )
 
     # Prepare data for serializer validation
     serializer_data = {
@@ -602,8 +547,8 @@ def expense_bill_upload_view(request, org_id):
         'fileType': request.data.get('fileType', 'Single Invoice/File')
     }
 
-    print(
-        f"[Expense DEBUG] Serializer data: files count = {len(serializer_data['files'])}, fileType = {serializer_data['fileType']}")
+    logger.debug("expense_bill_upload_view - Serializer data: files count = %s, fileType = %s",
+                 len(serializer_data['files']), serializer_data['fileType'])
 
     serializer = ZohoExpenseBillMultipleUploadSerializer(data=serializer_data)
     if not serializer.is_valid():
@@ -620,7 +565,8 @@ def expense_bill_upload_view(request, org_id):
     file_type = serializer.validated_data['fileType']
     created_bills = []
 
-    print(f"[Expense DEBUG] After serializer validation - files count: {len(files)}, fileType: {file_type}")
+    logger.debug("expense_bill_upload_view - After serializer validation - files count: %s, fileType: %s",
+                 len(files), file_type)
 
     if not files:
         return Response(
@@ -631,23 +577,23 @@ def expense_bill_upload_view(request, org_id):
     try:
         # Temporarily removing atomic transaction to debug
         # with transaction.atomic():
-        print(f"[Expense DEBUG] Starting to process {len(files)} files")
+        logger.debug("expense_bill_upload_view - Starting to process %s files", len(files))
+        split_pdfs = file_type == 'Multiple Invoice/File'
         for i, uploaded_file in enumerate(files):
-            print(f"[Expense DEBUG] Processing file {i + 1}/{len(files)}: {uploaded_file.name}")
-            file_extension = uploaded_file.name.lower().split('.')[-1]
+            logger.debug("expense_bill_upload_view - Processing file %s/%s: %s", i + 1, len(files), uploaded_file.name)
 
             # Handle PDF splitting for multiple invoice files
-            if file_type == 'Multiple Invoice/File' and file_extension == 'pdf':
-                print(f"[Expense DEBUG] Processing as PDF split for file: {uploaded_file.name}")
+            if split_pdfs and os.path.splitext(uploaded_file.name)[1].lower() == '.pdf':
+                logger.debug("expense_bill_upload_view - Processing as PDF split for file: %s", uploaded_file.name)
                 pdf_bills = process_pdf_splitting_expense(
                     uploaded_file, organization, file_type, request.user
                 )
-                print(f"[Expense DEBUG] PDF splitting created {len(pdf_bills)} bills")
+                logger.debug("expense_bill_upload_view - PDF splitting created %s bills", len(pdf_bills))
                 created_bills.extend(pdf_bills)
             else:
                 # Create single bill (including PDFs for single invoice type)
                 # Let the model generate billmunshiName automatically
-                print(f"[Expense DEBUG] Creating single bill for file: {uploaded_file.name}")
+                logger.debug("expense_bill_upload_view - Creating single bill for file: %s", uploaded_file.name)
                 bill = ExpenseBill.objects.create(
                     file=uploaded_file,
                     fileType=file_type,
@@ -655,14 +601,10 @@ def expense_bill_upload_view(request, org_id):
                     organization=organization,
                     uploaded_by=request.user
                 )
-                print(f"[Expense DEBUG] Created bill: {bill.billmunshiName} (ID: {bill.id})")
+                logger.debug("expense_bill_upload_view - Created bill: %s (ID: %s)", bill.billmunshiName, bill.id)
                 created_bills.append(bill)
 
-        print(f"[Expense DEBUG] Completed processing all files. Total bills created: {len(created_bills)}")
-
-        # Debug: Print all created bills
-        for i, bill in enumerate(created_bills):
-            print(f"[Expense DEBUG] Bill {i + 1}: {bill.billmunshiName} (ID: {bill.id})")
+        logger.debug("expense_bill_upload_view - Total bills created: %s", len(created_bills))
 
         response_serializer = ZohoExpenseBillSerializer(created_bills, many=True, context={'request': request})
 
@@ -709,15 +651,14 @@ def expense_bill_detail_view(request, org_id, bill_id):
         bill = ExpenseBill.objects.get(id=bill_id, organization=organization)
         logger.info(f"[DEBUG] expense_bill_detail_view - Found ExpenseBill: {bill.id}, status: {bill.status}")
 
-        # Get the next bill with 'Analysed' status
-        next_bill_id = None
-        analysed_bills = ExpenseBill.objects.filter(
+        # Get the next bill with 'Analysed' status; LIMIT 1 instead of loading every id
+        next_bill_id = ExpenseBill.objects.filter(
             organization=organization,
             status='Analysed'
-        ).exclude(id=bill_id).values_list('id', flat=True)
+        ).exclude(id=bill_id).order_by('created_at').values_list('id', flat=True).first()
 
-        if analysed_bills:
-            next_bill_id = str(analysed_bills[0])  # Get the first analysed bill
+        if next_bill_id:
+            next_bill_id = str(next_bill_id)  # Get the first analysed bill
             logger.info(f"[DEBUG] expense_bill_detail_view - Found next analysed Expense bill: {next_bill_id}")
         else:
             logger.info("[DEBUG] expense_bill_detail_view - No analysed Expense bills found for next_bill")
@@ -780,8 +721,8 @@ def expense_bill_analyze_view(request, org_id, bill_id):
 
         # Read file content
         try:
-            bill.file.seek(0)
-            file_content = bill.file.read()
+            with bill.file.open('rb') as bill_file:
+                file_content = bill_file.read()
             file_extension = bill.file.name.split('.')[-1].lower()
         except Exception as e:
             logger.error(f"Error reading bill file: {e}")
@@ -1011,14 +952,10 @@ def expense_bill_verify_view(request, org_id, bill_id):
                             processed_product_ids.add(str(new_product.id))
                             logger.info(f"Created new product {new_product.id}")
 
-                    # Delete products that were not in the update data
-                    products_to_delete = set(existing_products.keys()) - processed_product_ids
-                    if products_to_delete:
-                        ExpenseZohoProduct.objects.filter(
-                            id__in=products_to_delete,
-                            zohoBill=updated_bill
-                        ).delete()
-                        logger.info(f"Deleted {len(products_to_delete)} products not in update")
+                    # Delete products that were not in the update data; the diff is done by the database
+                    deleted_count, _ = updated_bill.products.exclude(id__in=processed_product_ids).delete()
+                    if deleted_count:
+                        logger.info(f"Deleted {deleted_count} products not in update")
 
                 # Update bill status
                 logger.info(f"[DEBUG] expense_bill_verify_view - Updating bill status from '{bill.status}' to 'Verified'")
@@ -1096,9 +1033,7 @@ def expense_bill_verify_view(request, org_id, bill_id):
 @permission_classes([IsAuthenticated])
 def expense_bill_sync_view(request, org_id, bill_id):
     """Sync verified expense bill to Zoho Books as an expense entry."""
-    # Immediate logging to ensure function is called - using both ERROR and print
-    logger.error(f"[EXPENSE SYNC] Starting expense sync for org_id: {org_id}, bill_id: {bill_id}")
-    print(f"[EXPENSE SYNC DEBUG] Function called - org_id: {org_id}, bill_id: {bill_id}")
+    logger.info(f"[EXPENSE SYNC] Starting expense sync for org_id: {org_id}, bill_id: {bill_id}")
 
     organization = get_organization_from_request(request, org_id=org_id)
     if not organization:
@@ -1133,9 +1068,15 @@ def expense_bill_sync_view(request, org_id, bill_id):
         # Get ExpenseZohoBill and products
         logger.info(f"[EXPENSE SYNC] Getting ExpenseZohoBill and products")
         try:
-            zoho_bill = ExpenseZohoBill.objects.get(selectBill=bill, organization=organization)
-            zoho_products = ExpenseZohoProduct.objects.filter(zohoBill=zoho_bill)
-            logger.info(f"[EXPENSE SYNC] Found ExpenseZohoBill: {zoho_bill.id}, Products count: {zoho_products.count()}")
+            zoho_bill = ExpenseZohoBill.objects.select_related(
+                'vendor', 'chart_of_accounts'
+            ).get(selectBill=bill, organization=organization)
+            # Join the account and tax each line item needs; materialised once so the
+            # count and emptiness checks below do not cost extra queries
+            zoho_products = list(ExpenseZohoProduct.objects.filter(zohoBill=zoho_bill).select_related(
+                'chart_of_accounts', 'taxes'
+            ))
+            logger.info(f"[EXPENSE SYNC] Found ExpenseZohoBill: {zoho_bill.id}, Products count: {len(zoho_products)}")
         except ExpenseZohoBill.DoesNotExist:
             logger.error(f"[EXPENSE SYNC] No ExpenseZohoBill found for bill: {bill_id}")
             return Response(
@@ -1143,7 +1084,7 @@ def expense_bill_sync_view(request, org_id, bill_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not zoho_products.exists():
+        if not zoho_products:
             return Response(
                 {"detail": "No expense items found to sync"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -1195,18 +1136,10 @@ def expense_bill_sync_view(request, org_id, bill_id):
 
         account_name = str(zoho_bill.chart_of_accounts.accountName)
 
-        # Log key values before creating expense data - using ERROR level for visibility
-        logger.error(f"[EXPENSE SYNC] Bill ID: {bill_id}")
-        logger.error(f"[EXPENSE SYNC] Bill No: '{zoho_bill.bill_no}'")
-        logger.error(f"[EXPENSE SYNC] Account Name: '{account_name}'")
-        logger.error(f"[EXPENSE SYNC] Vendor: {zoho_bill.vendor.companyName if zoho_bill.vendor else 'None'}")
-        logger.error(f"[EXPENSE SYNC] GST Treatment: {zoho_bill.vendor.gst_treatment if zoho_bill.vendor else 'None'}")
-        logger.error(f"[EXPENSE SYNC] GST Number: '{zoho_bill.vendor.gstNo if zoho_bill.vendor else 'None'}'")
-
-        print(f"[EXPENSE SYNC DEBUG] Bill ID: {bill_id}")
-        print(f"[EXPENSE SYNC DEBUG] Bill No: '{zoho_bill.bill_no}'")
-        print(f"[EXPENSE SYNC DEBUG] Account Name: '{account_name}'")
-        print(f"[EXPENSE SYNC DEBUG] GST Number: '{zoho_bill.vendor.gstNo if zoho_bill.vendor else 'None'}'")
+        # Log key values before creating expense data
+        logger.debug("[EXPENSE SYNC] Bill %s: bill no %r, account %r, vendor %s",
+                     bill_id, zoho_bill.bill_no, account_name,
+                     zoho_bill.vendor.companyName if zoho_bill.vendor else None)
 
         expense_data = {
             "paid_through_account_name": account_name,
@@ -1226,54 +1159,48 @@ def expense_bill_sync_view(request, org_id, bill_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Log the expense data before converting to JSON - using ERROR level to ensure visibility
-        logger.error(f"[EXPENSE SYNC] Raw expense_data: {expense_data}")
-        print(f"[EXPENSE SYNC DEBUG] Raw expense_data: {expense_data}")
 
         # Sync to Zoho Books as expense
         url = f"https://www.zohoapis.in/books/v3/expenses?organization_id={current_token.organisationId}"
-        payload = json.dumps(expense_data)
+        payload = json.dumps(expense_data, separators=(',', ':'))
 
-        # Log the payload being sent to Zoho for debugging - using ERROR level to ensure visibility
-        logger.error(f"[EXPENSE SYNC] Payload being sent to Zoho Books API: {payload}")
-        logger.error(f"[EXPENSE SYNC] URL: {url}")
-        print(f"[EXPENSE SYNC DEBUG] Payload: {payload}")
-        print(f"[EXPENSE SYNC DEBUG] URL: {url}")
+        # The payload carries vendor GST details, so it is only logged at DEBUG
+        logger.debug("[EXPENSE SYNC] Payload being sent to %s: %s", url, payload)
 
+        access_token = get_zoho_access_token(current_token)
         headers = {
-            'Authorization': f'Zoho-oauthtoken {current_token.accessToken}',
+            'Authorization': f'Zoho-oauthtoken {access_token}',
             'Content-Type': 'application/json'
         }
 
         try:
             logger.info(f"[EXPENSE SYNC] Making API call to Zoho Books")
-            response = requests.post(url, headers=headers, data=payload)
+            response = ZOHO_API_SESSION.post(url, headers=headers, data=payload, timeout=ZOHO_API_TIMEOUT)
             logger.info(f"[EXPENSE SYNC] API response status: {response.status_code}")
 
             # Handle token refresh if needed
             if response.status_code == 401:
                 logger.info(f"[EXPENSE SYNC] Token expired, refreshing...")
-                new_access_token = refresh_zoho_access_token(current_token)
+                new_access_token = refresh_zoho_access_token(current_token, failed_token=access_token)
                 if new_access_token:
                     headers['Authorization'] = f'Zoho-oauthtoken {new_access_token}'
-                    response = requests.post(url, headers=headers, data=payload)
+                    response = ZOHO_API_SESSION.post(url, headers=headers, data=payload, timeout=ZOHO_API_TIMEOUT)
                     logger.info(f"[EXPENSE SYNC] Retry API response status: {response.status_code}")
 
+            response_data = zoho_response_body(response)
             if response.status_code == 201:
                 # Update bill status
                 bill.status = 'Synced'
                 bill.save()
 
-                response_data = response.json()
                 return Response({
                     "detail": "Expense bill synced to Zoho successfully",
                     "zoho_expense_id": response_data.get('expense', {}).get('expense_id')
                 })
             else:
-                response_json = response.json() if response.content else {}
-                error_message = response_json.get("message", "Failed to send expense to Zoho")
+                error_message = response_data.get("message", "Failed to send expense to Zoho")
                 logger.error(f"[EXPENSE SYNC] Zoho API error - Status: {response.status_code}")
-                logger.error(f"[EXPENSE SYNC] Full response: {response.text}")
+                logger.error(f"[EXPENSE SYNC] Full response: {response_data}")
                 logger.error(f"[EXPENSE SYNC] Error message: {error_message}")
                 logger.error(f"Zoho expense sync failed: {response.status_code} - {error_message}")
                 return Response(
@@ -1320,17 +1247,10 @@ def expense_bill_delete_view(request, org_id, bill_id):
     try:
         bill = ExpenseBill.objects.get(id=bill_id, organization=organization)
 
-        # Delete the file from storage if it exists
-        if bill.file:
-            try:
-                file_path = os.path.join(settings.MEDIA_ROOT, str(bill.file))
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as e:
-                logger.warning(f"Could not delete file {bill.file}: {str(e)}")
-
-        # Delete the bill record from the database
-        bill.delete()
+        # Delete the bill record, then its file once the delete has committed
+        with transaction.atomic():
+            bill.delete()
+            delete_bill_file_on_commit(bill.file)
 
         return Response({
             "detail": "Expense bill and associated file deleted successfully"
@@ -0,0 +1,120 @@
+# apps/module/zoho/management/commands/analyze_vendor_bills.py
+
+import logging
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.organizations.models import Organization
+from apps.module.zoho.models import VendorBill
+from apps.module.zoho.vendor_views import (
+    submit_vendor_bills_batch,
+    collect_vendor_bills_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Analyze Draft vendor bills in bulk through the OpenAI Batch API. '
+        'Run with --submit to queue bills and with --collect (e.g. from cron) to apply finished batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--submit',
+            action='store_true',
+            help='Submit Draft vendor bills that are not already queued to a new OpenAI batch'
+        )
+        parser.add_argument(
+            '--collect',
+            action='store_true',
+            help='Check pending OpenAI batches and apply the results of finished ones'
+        )
+        parser.add_argument(
+            '--organization',
+            type=str,
+            help='Organization ID (UUID) to submit bills for. If not provided, submits for all organizations.'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Maximum number of bills to submit in one batch'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be submitted or collected without calling OpenAI'
+        )
+
+    def handle(self, *args, **options):
+        submit = options.get('submit')
+        collect = options.get('collect')
+        dry_run = options.get('dry_run')
+
+        if not submit and not collect:
+            raise CommandError('Specify --submit, --collect or both')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        if collect:
+            self.collect_batches(dry_run)
+
+        if submit:
+            self.submit_bills(options.get('organization'), options.get('limit'), dry_run)
+
+    def submit_bills(self, organization_id, limit, dry_run):
+        """Queue Draft vendor bills into a single OpenAI batch."""
+        queryset = VendorBill.objects.filter(status='Draft', openai_batch_id__isnull=True).order_by('created_at')
+
+        if organization_id:
+            try:
+                organization = Organization.objects.get(id=organization_id)
+            except Organization.DoesNotExist:
+                raise CommandError(f'Organization with ID {organization_id} does not exist')
+            queryset = queryset.filter(organization=organization)
+
+        if limit:
+            queryset = queryset[:limit]
+
+        bills = list(queryset)
+        self.stdout.write(f'Found {len(bills)} Draft vendor bills to submit')
+
+        if dry_run or not bills:
+            return
+
+        try:
+            batch = submit_vendor_bills_batch(bills)
+        except Exception as e:
+            logger.error(f'Failed to submit vendor bills batch: {str(e)}', exc_info=True)
+            raise CommandError(f'Failed to submit vendor bills batch: {str(e)}')
+
+        if batch is None:
+            self.stdout.write(self.style.WARNING('No bills could be prepared for submission'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Submitted OpenAI batch {batch.id}'))
+
+    def collect_batches(self, dry_run):
+        """Apply results for every pending OpenAI batch that has finished."""
+        batch_ids = list(
+            VendorBill.objects.filter(openai_batch_id__isnull=False)
+            .values_list('openai_batch_id', flat=True)
+            .distinct()
+        )
+        self.stdout.write(f'Found {len(batch_ids)} pending OpenAI batches')
+
+        if dry_run:
+            return
+
+        for batch_id in batch_ids:
+            try:
+                batch_status = collect_vendor_bills_batch(batch_id)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  ✗ Error collecting batch {batch_id}: {str(e)}'))
+                logger.error(f'Error collecting OpenAI batch {batch_id}: {str(e)}', exc_info=True)
+                continue
+
+            if batch_status is None:
+                self.stdout.write(f'  … Batch {batch_id} still in progress')
+            else:
+                self.stdout.write(f'  ✓ Batch {batch_id} {batch_status}')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2025-11-10 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0016_expensezohobill_due_date_journalzohobill_due_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorbill',
+            name='openai_batch_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2025-11-10 11:40
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def populate_company_name_lower(apps, schema_editor):
+    ZohoVendor = apps.get_model('zoho', 'ZohoVendor')
+    ZohoVendor.objects.update(companyName_lower=Lower(Trim('companyName')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0017_vendorbill_openai_batch_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zohovendor',
+            name='companyName_lower',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(populate_company_name_lower, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='zohovendor',
+            index=models.Index(fields=['organization', 'companyName_lower'], name='zohovendor_org_namelower_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2025-11-10 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0018_zohovendor_companyname_lower'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorbill',
+            name='file_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['organization', 'file_hash'], name='vendorbill_org_filehash_idx'),
+        ),
+    ]
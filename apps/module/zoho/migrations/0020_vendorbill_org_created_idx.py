@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2025-11-10 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0019_vendorbill_file_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['organization', '-created_at'], name='vendorbill_org_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2025-11-10 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0020_vendorbill_org_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['organization', 'status', 'created_at'], name='vendorbill_org_status_idx'),
+        ),
+    ]
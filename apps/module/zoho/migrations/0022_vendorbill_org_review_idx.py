@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2025-11-10 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0021_vendorbill_org_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(condition=models.Q(('status__in', ['Analysed', 'Verified'])), fields=['organization', '-created_at'], name='vendorbill_org_review_idx'),
+        ),
+    ]
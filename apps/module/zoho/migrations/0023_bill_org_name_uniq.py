@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2025-11-10 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoho', '0022_vendorbill_org_review_idx'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='vendorbill',
+            constraint=models.UniqueConstraint(fields=('organization', 'billmunshiName'), name='vendorbill_org_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='journalbill',
+            constraint=models.UniqueConstraint(fields=('organization', 'billmunshiName'), name='journalbill_org_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='expensebill',
+            constraint=models.UniqueConstraint(fields=('organization', 'billmunshiName'), name='expensebill_org_name_uniq'),
+        ),
+    ]
@@ -1,17 +1,27 @@
 # apps/zoho/models.py
 
+import hashlib
+import logging
 import os
 import re
+import time
 import uuid
 
+from datetime import date
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
 from apps.organizations.models import Organization
+from .utils import refresh_zoho_access_token
+
+logger = logging.getLogger(__name__)
 
 
 # -----------------------------
@@ -44,6 +54,58 @@ class BaseTeamModel(models.Model):
         abstract = True
 
 
+class BillmunshiNameMixin:
+    """
+    Numbers uploaded bills per organization and day as <YYYYMMDD><BILLMUNSHI_PREFIX><5 digits>.
+    Bills saved without a billmunshiName get the next free one. Each model pairs this with a
+    unique (organization, billmunshiName) constraint, so a numbering race fails loudly.
+    """
+    BILLMUNSHI_PREFIX = ""
+
+    @classmethod
+    def generate_billmunshi_names(cls, organization, count=1):
+        """
+        Return the next `count` consecutive billmunshiNames for today in an organization,
+        so bulk-created bills can be numbered with a single query.
+
+        Must run in the transaction that inserts the bills: the organization row stays locked
+        until it ends, so concurrent uploads are numbered one after the other.
+        """
+        Organization.objects.select_for_update().filter(pk=organization.pk).values_list("pk", flat=True).get()
+        bill_prefix = f"{date.today().strftime('%Y%m%d')}{cls.BILLMUNSHI_PREFIX}"
+
+        # Get all existing bills with today's date prefix for this organization
+        existing_bills = cls.objects.filter(
+            organization=organization,
+            billmunshiName__startswith=bill_prefix
+        ).values_list('billmunshiName', flat=True)
+
+        # Extract numbers and find the maximum for today
+        max_num = 0
+        pattern = re.compile(rf"{re.escape(bill_prefix)}(\d+)$")
+        for bill_name in existing_bills:
+            if bill_name:
+                m = pattern.match(bill_name)
+                if m:
+                    max_num = max(max_num, int(m.group(1)))
+
+        logger.debug("Next %s number after %d for organization %s", bill_prefix, max_num, organization.pk)
+        return [f"{bill_prefix}{max_num + offset:05d}" for offset in range(1, count + 1)]  # 5-digit padding
+
+    def save(self, *args, **kwargs):
+        if not self.billmunshiName and self.file:
+            # Number and insert in one transaction so the organization lock covers both
+            with transaction.atomic():
+                self.billmunshiName = self.generate_billmunshi_names(self.organization)[0]
+                logger.debug("Generated billmunshiName %s for %s file %s",
+                             self.billmunshiName, type(self).__name__, self.file.name)
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
+        logger.info(f"Successfully saved {type(self).__name__}: {self.billmunshiName} (ID: {self.id})")
+
+
 # ---------------------------
 # Zoho Settings / Credentials
 # ---------------------------
@@ -65,6 +127,8 @@ class ZohoCredentials(BaseTeamModel):
     created_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
 
+    CREDENTIALS_CACHE_TIMEOUT = 50 * 60
+
     class Meta:
         verbose_name = "Zoho Credential"
         verbose_name_plural = "Zoho Credentials"
@@ -72,6 +136,26 @@ class ZohoCredentials(BaseTeamModel):
     def __str__(self):
         return f"{self.organization.name} · ZohoCredentials"
 
+    @classmethod
+    def for_organization(cls, organization):
+        """
+        The organization's credentials, cached until they are saved or deleted.
+        Raises DoesNotExist like a plain get() when none are configured.
+        """
+        cache_key = _credentials_cache_key(organization.pk)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            credentials = cls.objects.filter(organization=organization).first() or ""
+            cache.set(cache_key, credentials, cls.CREDENTIALS_CACHE_TIMEOUT)
+        if not credentials:
+            raise cls.DoesNotExist("Zoho credentials are not configured for this organization")
+        return credentials
+
+    @property
+    def token_cache_key(self):
+        """Cache key under which a freshly refreshed access token is shared between workers."""
+        return f"zoho:token:{self.pk}"
+
     def is_token_valid(self):
         """Check if the current access token is still valid"""
         if not self.accessToken or not self.token_expiry:
@@ -79,39 +163,38 @@ class ZohoCredentials(BaseTeamModel):
         return timezone.now() < self.token_expiry
 
     def refresh_token(self):
-        """Refresh the access token using the refresh token"""
+        """
+        Refresh the access token using the refresh token.
+        Goes through the shared, cache-locked refresh so concurrent callers make one OAuth call.
+        """
         if not self.refreshToken:
             return False
 
-        url = (
-            "https://accounts.zoho.in/oauth/v2/token"
-            f"?refresh_token={self.refreshToken}&client_id={self.clientId}"
-            f"&client_secret={self.clientSecret}&grant_type=refresh_token"
-        )
+        access_token = refresh_zoho_access_token(self)
+        if not access_token:
+            return False
+
+        if access_token != self.accessToken:
+            # Another worker did the refresh; load the token and expiry it saved
+            self.refresh_from_db(fields=["accessToken", "token_expiry"])
+            self.accessToken = access_token
+        return True
+
+
+def _credentials_cache_key(organization_id):
+    return f"zoho:credentials:{organization_id}"
+
 
-        try:
-            import requests
-            response = requests.post(url, timeout=30)
-
-            if response.status_code == 200:
-                data = response.json()
-                if "access_token" in data:
-                    self.accessToken = data["access_token"]
-                    # Set expiry to 50 minutes from now (Zoho tokens last 1 hour)
-                    self.token_expiry = timezone.now() + timezone.timedelta(minutes=50)
-                    self.save(update_fields=["accessToken", "token_expiry", "update_at"])
-                    return True
-            # Log the error for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to refresh Zoho token: {response.status_code} - {response.text}")
-        except Exception as e:
-            # Log the exception for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.exception(f"Exception refreshing Zoho token: {str(e)}")
-
-        return False
+@receiver(post_save, sender=ZohoCredentials)
+def invalidate_cached_access_token(sender, instance, **kwargs):
+    """A saved token (e.g. newly generated) supersedes any token shared through the cache."""
+    cache.delete_many([instance.token_cache_key, _credentials_cache_key(instance.organization_id)])
+
+
+@receiver(post_delete, sender=ZohoCredentials)
+def invalidate_cached_credentials(sender, instance, **kwargs):
+    """Removed credentials must not keep being served from the cache."""
+    cache.delete_many([instance.token_cache_key, _credentials_cache_key(instance.organization_id)])
 
 
 # --------------
@@ -126,17 +209,79 @@ class ZohoVendor(BaseTeamModel):
     id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)
     contactId = models.CharField(max_length=100, unique=True)
     companyName = models.CharField(max_length=100)
+    # Normalized copy of companyName for indexed case-insensitive lookups
+    companyName_lower = models.CharField(max_length=100, blank=True, default="", editable=False)
     gstNo = models.CharField(max_length=30)
     gst_treatment = models.CharField(max_length=100, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    LOOKUP_CACHE_TIMEOUT = 60 * 60
+
     class Meta:
         verbose_name = "Zoho Vendor"
         verbose_name_plural = "Zoho Vendors"
+        indexes = [
+            models.Index(fields=["organization", "companyName_lower"], name="zohovendor_org_namelower_idx"),
+        ]
 
     def __str__(self):
         return self.companyName
 
+    def save(self, *args, **kwargs):
+        self.companyName_lower = (self.companyName or "").strip().lower()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "companyName" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "companyName_lower"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def lookup_by_name(cls, organization, company_name):
+        """
+        Case-insensitive lookup of an organization's vendor by company name.
+        Results (including misses) are cached until any vendor of the organization changes.
+        """
+        name_lower = (company_name or "").strip().lower()
+        if not name_lower:
+            return None
+
+        generation = _vendor_lookup_generation(organization.pk)
+        name_hash = hashlib.md5(name_lower.encode("utf-8")).hexdigest()
+        cache_key = f"zoho:vendor_lookup:{organization.pk}:{generation}:{name_hash}"
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached or None
+
+        vendor = cls.objects.filter(organization=organization, companyName_lower=name_lower).first()
+        cache.set(cache_key, vendor or "", cls.LOOKUP_CACHE_TIMEOUT)
+        return vendor
+
+    @staticmethod
+    def invalidate_lookups(organization_id):
+        """Drop cached name lookups for an organization; bulk writes must call this themselves."""
+        cache.set(_vendor_lookup_generation_key(organization_id), time.time_ns(), None)
+
+
+def _vendor_lookup_generation_key(organization_id):
+    return f"zoho:vendor_lookup_gen:{organization_id}"
+
+
+def _vendor_lookup_generation(organization_id):
+    """Current lookup cache generation for an organization; a fresh value is never reused."""
+    key = _vendor_lookup_generation_key(organization_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+@receiver(post_save, sender=ZohoVendor)
+@receiver(post_delete, sender=ZohoVendor)
+def invalidate_vendor_lookup_cache(sender, instance, **kwargs):
+    """Drop cached name lookups for the organization whenever one of its vendors changes."""
+    ZohoVendor.invalidate_lookups(instance.organization_id)
+
 
 # -----------------------
 # Zoho Chart of Accounts
@@ -239,11 +384,12 @@ class ZohoVendorCredit(BaseTeamModel):
 #         Vendor Bills
 # ===============================
 
-class VendorBill(BaseTeamModel):
+class VendorBill(BillmunshiNameMixin, BaseTeamModel):
     """
     Represents a vendor bill/invoice that has been uploaded to the system.
     Tracks the bill file, analysis status, and processing state.
     """
+    BILLMUNSHI_PREFIX = "ZB"
     BILL_STATUS_CHOICES = (
         ("Draft", "Draft"),
         ("Analysed", "Analysed"),
@@ -263,6 +409,10 @@ class VendorBill(BaseTeamModel):
     analysed_data = models.JSONField(default=dict, null=True, blank=True)
     status = models.CharField(max_length=10, choices=BILL_STATUS_CHOICES, default="Draft", blank=True)
     process = models.BooleanField(default=False)
+    # Pending OpenAI Batch API job this bill was submitted to (see analyze_vendor_bills command)
+    openai_batch_id = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+    # SHA-256 of the uploaded file; re-uploads of the same file reuse the earlier analysis
+    file_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -276,47 +426,50 @@ class VendorBill(BaseTeamModel):
     class Meta:
         verbose_name = "Vendor Bill"
         verbose_name_plural = "Vendor Bills"
+        indexes = [
+            models.Index(fields=["organization", "file_hash"], name="vendorbill_org_filehash_idx"),
+            models.Index(fields=["organization", "-created_at"], name="vendorbill_org_created_idx"),
+            models.Index(fields=["organization", "status", "created_at"], name="vendorbill_org_status_idx"),
+            # The "analysed" list tab filters on two statuses, which the index above cannot return in date order
+            models.Index(
+                fields=["organization", "-created_at"],
+                condition=models.Q(status__in=["Analysed", "Verified"]),
+                name="vendorbill_org_review_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["organization", "billmunshiName"], name="vendorbill_org_name_uniq"),
+        ]
 
     def __str__(self):
         return self.billmunshiName or f"Bill:{self.id}"
 
-    def save(self, *args, **kwargs):
-        if not self.billmunshiName and self.file:
-            print(f"[MODEL DEBUG] Generating billmunshiName for VendorBill with file: {self.file.name}")
-
-            from datetime import date
-            today = date.today()
-            date_prefix = today.strftime("%Y%m%d")
-            bill_prefix = f"{date_prefix}ZB"
-
-            # Get all existing bills with today's date prefix for this organization
-            existing_bills = VendorBill.objects.filter(
-                organization=self.organization,
-                billmunshiName__startswith=bill_prefix
-            ).values_list('billmunshiName', flat=True)
-
-            print(f"[MODEL DEBUG] Found {len(existing_bills)} existing bills with prefix {bill_prefix}")
-
-            # Extract numbers and find the maximum for today
-            max_num = 0
-            pattern = rf"{re.escape(bill_prefix)}(\d+)$"
-            for bill_name in existing_bills:
-                if bill_name:
-                    m = re.match(pattern, bill_name)
-                    if m:
-                        num = int(m.group(1))
-                        max_num = max(max_num, num)
-
-            next_num = max_num + 1
-            self.billmunshiName = f"{bill_prefix}{next_num:05d}"  # 5-digit padding
-            print(f"[MODEL DEBUG] Generated billmunshiName: {self.billmunshiName}")
-
-        super().save(*args, **kwargs)
-
-        # Log successful save
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Successfully saved VendorBill: {self.billmunshiName} (ID: {self.id})")
+    @staticmethod
+    def compute_file_hash(file):
+        """SHA-256 hex digest of an uploaded or stored file, read in chunks; the file is rewound afterwards."""
+        digest = hashlib.sha256()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(64 * 1024), b""):
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
+
+    def prior_analysis(self):
+        """
+        analysed_data of an earlier, successfully analysed bill of the same organization
+        with identical file content, or None when there is none.
+        """
+        if not self.file_hash:
+            return None
+        return (
+            VendorBill.objects
+            .filter(organization_id=self.organization_id, file_hash=self.file_hash, process=True)
+            .exclude(pk=self.pk)
+            .exclude(analysed_data__has_key="error")
+            .order_by("-created_at")
+            .values_list("analysed_data", flat=True)
+            .first()
+        )
 
 
 class VendorZohoBill(BaseTeamModel):
@@ -410,12 +563,13 @@ class VendorZohoProduct(BaseTeamModel):
 #         Journal Bills
 # ===============================
 
-class JournalBill(BaseTeamModel):
+class JournalBill(BillmunshiNameMixin, BaseTeamModel):
     """
     Represents an expense bill/invoice that has been uploaded to the system.
     Similar to VendorBill but specifically for expense transactions.
     Tracks the bill file, analysis status, and processing state.
     """
+    BILLMUNSHI_PREFIX = "ZJ"
     BILL_STATUS_CHOICES = (
         ("Draft", "Draft"),
         ("Analysed", "Analysed"),
@@ -448,48 +602,13 @@ class JournalBill(BaseTeamModel):
     class Meta:
         verbose_name = "Journal Bill"
         verbose_name_plural = "Journal Bills"
+        constraints = [
+            models.UniqueConstraint(fields=["organization", "billmunshiName"], name="journalbill_org_name_uniq"),
+        ]
 
     def __str__(self):
         return self.billmunshiName or f"JournalBill:{self.id}"
 
-    def save(self, *args, **kwargs):
-        if not self.billmunshiName and self.file:
-            print(f"[MODEL DEBUG] Generating billmunshiName for JournalBill with file: {self.file.name}")
-
-            from datetime import date
-            today = date.today()
-            date_prefix = today.strftime("%Y%m%d")
-            bill_prefix = f"{date_prefix}ZJ"
-
-            # Get all existing bills with today's date prefix for this organization
-            existing_bills = JournalBill.objects.filter(
-                organization=self.organization,
-                billmunshiName__startswith=bill_prefix
-            ).values_list('billmunshiName', flat=True)
-
-            print(f"[MODEL DEBUG] Found {len(existing_bills)} existing bills with prefix {bill_prefix}")
-
-            # Extract numbers and find the maximum for today
-            max_num = 0
-            pattern = rf"{re.escape(bill_prefix)}(\d+)$"
-            for bill_name in existing_bills:
-                if bill_name:
-                    m = re.match(pattern, bill_name)
-                    if m:
-                        num = int(m.group(1))
-                        max_num = max(max_num, num)
-
-            next_num = max_num + 1
-            self.billmunshiName = f"{bill_prefix}{next_num:05d}"  # 5-digit padding
-            print(f"[MODEL DEBUG] Generated billmunshiName: {self.billmunshiName}")
-
-        super().save(*args, **kwargs)
-
-        # Log successful save
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Successfully saved JournalBill: {self.billmunshiName} (ID: {self.id})")
-
 
 class JournalZohoBill(BaseTeamModel):
     """
@@ -589,12 +708,13 @@ class JournalZohoProduct(BaseTeamModel):
 #         Expense Bills
 # ===============================
 
-class ExpenseBill(BaseTeamModel):
+class ExpenseBill(BillmunshiNameMixin, BaseTeamModel):
     """
     Represents an expense bill/invoice that has been uploaded to the system.
     Similar to VendorBill but specifically for expense transactions.
     Tracks the bill file, analysis status, and processing state.
     """
+    BILLMUNSHI_PREFIX = "ZE"
     BILL_STATUS_CHOICES = (
         ("Draft", "Draft"),
         ("Analysed", "Analysed"),
@@ -627,48 +747,13 @@ class ExpenseBill(BaseTeamModel):
     class Meta:
         verbose_name = "Expense Bill"
         verbose_name_plural = "Expense Bills"
+        constraints = [
+            models.UniqueConstraint(fields=["organization", "billmunshiName"], name="expensebill_org_name_uniq"),
+        ]
 
     def __str__(self):
         return self.billmunshiName or f"ExpenseBill:{self.id}"
 
-    def save(self, *args, **kwargs):
-        if not self.billmunshiName and self.file:
-            print(f"[MODEL DEBUG] Generating billmunshiName for ExpenseBill with file: {self.file.name}")
-
-            from datetime import date
-            today = date.today()
-            date_prefix = today.strftime("%Y%m%d")
-            bill_prefix = f"{date_prefix}ZE"
-
-            # Get all existing bills with today's date prefix for this organization
-            existing_bills = ExpenseBill.objects.filter(
-                organization=self.organization,
-                billmunshiName__startswith=bill_prefix
-            ).values_list('billmunshiName', flat=True)
-
-            print(f"[MODEL DEBUG] Found {len(existing_bills)} existing bills with prefix {bill_prefix}")
-
-            # Extract numbers and find the maximum for today
-            max_num = 0
-            pattern = rf"{re.escape(bill_prefix)}(\d+)$"
-            for bill_name in existing_bills:
-                if bill_name:
-                    m = re.match(pattern, bill_name)
-                    if m:
-                        num = int(m.group(1))
-                        max_num = max(max_num, num)
-
-            next_num = max_num + 1
-            self.billmunshiName = f"{bill_prefix}{next_num:05d}"  # 5-digit padding
-            print(f"[MODEL DEBUG] Generated billmunshiName: {self.billmunshiName}")
-
-        super().save(*args, **kwargs)
-
-        # Log successful save
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Successfully saved ExpenseBill: {self.billmunshiName} (ID: {self.id})")
-
 
 class ExpenseZohoBill(BaseTeamModel):
     """
@@ -26,6 +26,20 @@ class AnalysisResponseSerializer(serializers.Serializer):
     analyzed_data = serializers.JSONField(required=False)
 
 
+class BulkAnalysisResponseSerializer(serializers.Serializer):
+    """Serializer for bulk bill analysis responses."""
+    detail = serializers.CharField()
+    results = serializers.ListField(child=serializers.JSONField())
+
+
+class VerifyResponseSerializer(serializers.Serializer):
+    """Serializer for bill verification responses."""
+    id = serializers.CharField()
+    bill_id = serializers.CharField()
+    status = serializers.CharField()
+    products_count = serializers.IntegerField()
+
+
 class ZohoSyncResponseSerializer(serializers.Serializer):
     """Serializer for Zoho sync operation responses."""
     detail = serializers.CharField()
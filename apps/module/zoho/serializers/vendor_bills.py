@@ -258,6 +258,7 @@ class ZohoVendorBillDetailSerializer(serializers.Serializer):
     # VendorZohoBill information
     zoho_bill = VendorZohoBillSerializer(read_only=True)
     next_bill = serializers.CharField(read_only=True, allow_null=True)
+    analysis_in_progress = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         ref_name = "ZohoVendorBillDetail"
@@ -413,6 +414,20 @@ class ZohoVendorBillMultipleUploadSerializer(serializers.Serializer):
         return attrs
 
 
+
+class ZohoVendorBillBulkAnalyzeSerializer(serializers.Serializer):
+    """Serializer for analyzing several Draft vendor bills in one request"""
+
+    bill_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=20,  # Same cap as multi-file upload
+        help_text="IDs of Draft vendor bills to analyze"
+    )
+
+    class Meta:
+        ref_name = "ZohoVendorBillBulkAnalyzeRequest"
+
 class VerifyProductItemSerializer(serializers.Serializer):
     """
     Edits to each product during verification.
@@ -18,6 +18,7 @@ from .vendor_views import (
     vendor_bill_upload_view,
     vendor_bill_detail_view as vendor_bill_detail_main,
     vendor_bill_analyze_view as vendor_bill_analyze_main,
+    vendor_bills_bulk_analyze_view,
     vendor_bill_verify_view as vendor_bill_verify_main,
     vendor_bill_sync_view as vendor_bill_sync_main,
     vendor_bill_delete_view,
@@ -37,6 +38,7 @@ from .views import (
     taxes_sync_view,
     tds_tcs_list_view,
     tds_tcs_sync_view,
+    zoho_full_sync_view,
 )
 
 # Import expense bill views from expense_views.py
@@ -73,12 +75,14 @@ urlpatterns = [
         path('taxes/sync/', taxes_sync_view, name='taxes_sync'),
         path('tds-tcs/', tds_tcs_list_view, name='tds_tcs_list'),
         path('tds-tcs/sync/', tds_tcs_sync_view, name='tds_tcs_sync'),
+        path('sync/', zoho_full_sync_view, name='zoho_full_sync'),
 
         # ============================================================================
         # Vendor Bills API Endpoints
         # ============================================================================
         path('vendor-bills/', vendor_bills_list_main, name='vendor_bills_list'),
         path('vendor-bills/upload/', vendor_bill_upload_view, name='vendor_bills_upload'),
+        path('vendor-bills/analyze/', vendor_bills_bulk_analyze_view, name='vendor_bills_bulk_analyze'),
         path('vendor-bills/<str:bill_id>/details/', vendor_bill_detail_main, name='vendor_bill_detail'),
         path('vendor-bills/<str:bill_id>/analyze/', vendor_bill_analyze_main, name='vendor_bill_analyze'),
         path('vendor-bills/<str:bill_id>/verify/', vendor_bill_verify_main, name='vendor_bill_verify'),
@@ -0,0 +1,253 @@
+# apps/module/zoho/utils.py
+
+"""
+Helpers shared by the Zoho vendor, expense, journal and settings views: the pooled
+Zoho Books and OAuth sessions, the cache-shared access token, the OpenAI client and
+image budget, and bill file housekeeping.
+"""
+
+import base64
+import logging
+import os
+import time
+from datetime import timedelta
+from io import BytesIO
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from openai import OpenAI
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# Zoho Books
+# ============================================================================
+
+# Shared session for Zoho OAuth token refreshes: keeps TLS connections alive and
+# retries rate limits and transient server errors with backoff.
+ZOHO_TOKEN_URL = "https://accounts.zoho.in/oauth/v2/token"
+# Refreshed access tokens are shared through the cache for slightly less than their
+# 1 hour lifetime; the lock makes concurrent 401s trigger a single refresh.
+_ZOHO_TOKEN_CACHE_TIMEOUT = 55 * 60
+_ZOHO_TOKEN_LOCK_TIMEOUT = 30
+_ZOHO_TOKEN_WAIT_SECONDS = 10
+ZOHO_AUTH_SESSION = requests.Session()
+ZOHO_AUTH_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['POST'],
+    ),
+))
+# Shared session for Zoho Books API calls: bill syncs (POST) and the paged settings
+# lists (GET). Creating a bill is not idempotent, so only failures where Zoho cannot
+# have processed the request (connection errors, 429, 503) are retried, for both
+# methods; the final response is returned rather than raised.
+ZOHO_API_TIMEOUT = (5, 30)
+ZOHO_API_SESSION = requests.Session()
+ZOHO_API_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=2,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429, 503],
+        allowed_methods=['GET', 'POST'],
+        raise_on_status=False,
+    ),
+))
+
+
+def zoho_response_body(response):
+    """Decode a Zoho response body once: JSON when Zoho says so, otherwise the raw text."""
+    if not response.content:
+        return {}
+    if 'application/json' in response.headers.get('Content-Type', ''):
+        try:
+            return response.json()
+        except ValueError:
+            pass
+    return {"message": response.text}
+
+
+def raise_for_zoho_status(response, body):
+    """Raise requests.HTTPError for a failed Zoho response, carrying the already-decoded body."""
+    if not response.ok:
+        raise requests.HTTPError(
+            f"{response.status_code} Zoho API error: {body.get('message', body)}",
+            response=response,
+        )
+
+
+def get_zoho_access_token(current_token):
+    """Return the freshest known access token, preferring one refreshed by another worker."""
+    return cache.get(current_token.token_cache_key) or current_token.accessToken
+
+
+def refresh_zoho_access_token(current_token, failed_token=None):
+    """
+    Refresh Zoho access token using refresh token.
+
+    Concurrent callers are collapsed onto one refresh: the worker that takes the
+    cache lock talks to Zoho, the others wait briefly for the token it publishes.
+    """
+    failed_token = failed_token or current_token.accessToken
+    token_key = current_token.token_cache_key
+    lock_key = f"zoho:token_lock:{current_token.pk}"
+
+    # Another worker may already have replaced the token that just failed
+    cached_token = cache.get(token_key)
+    if cached_token and cached_token != failed_token:
+        return cached_token
+
+    if not cache.add(lock_key, "1", _ZOHO_TOKEN_LOCK_TIMEOUT):
+        deadline = time.monotonic() + _ZOHO_TOKEN_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(0.25)
+            cached_token = cache.get(token_key)
+            if cached_token and cached_token != failed_token:
+                return cached_token
+        logger.error("Timed out waiting for a concurrent Zoho token refresh")
+        return None
+
+    refresh_token = current_token.refreshToken
+    client_id = current_token.clientId
+    client_secret = current_token.clientSecret
+
+    # Credentials go in the form body so they never appear in URLs or proxy logs
+    data = {
+        'refresh_token': refresh_token,
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'grant_type': 'refresh_token',
+    }
+
+    try:
+        response = ZOHO_AUTH_SESSION.post(ZOHO_TOKEN_URL, data=data, timeout=10)
+        # Zoho answers some failures (e.g. a revoked refresh token) with 200 and an error body
+        new_access_token = response.json().get('access_token') if response.status_code == 200 else None
+        if new_access_token:
+            current_token.accessToken = new_access_token
+            # Zoho tokens last 1 hour; treat them as expired a little earlier
+            current_token.token_expiry = timezone.now() + timedelta(minutes=55)
+            current_token.save(update_fields=["accessToken", "token_expiry", "update_at"])
+            cache.set(token_key, new_access_token, _ZOHO_TOKEN_CACHE_TIMEOUT)
+            return new_access_token
+        else:
+            logger.error(f"Failed to refresh token: {response.status_code} - {response.text}")
+            return None
+    except Exception as e:
+        logger.error(f"Error refreshing token: {str(e)}")
+        return None
+    finally:
+        cache.delete(lock_key)
+
+
+# ============================================================================
+# OpenAI
+# ============================================================================
+
+# Bill images are downscaled to this bounding box and re-encoded as JPEG before being
+# sent to OpenAI; larger images only inflate the request payload. PDFs analysed
+# directly are rendered at this size, so both paths stay on the same budget.
+OPENAI_MAX_IMAGE_EDGE = 1536
+OPENAI_JPEG_QUALITY = 85
+# JPG/PNG uploads within both the bounding box and this size are sent unchanged.
+OPENAI_PASSTHROUGH_MAX_BYTES = 400 * 1024
+
+# Retries (with the client's exponential backoff) on rate limits and timeouts.
+_OPENAI_MAX_RETRIES = 3
+_OPENAI_TIMEOUT = 120.0
+# Created on first use and shared across calls, modules and worker threads so the
+# underlying HTTP connection pool is reused.
+_OPENAI_CLIENT = None
+
+
+def openai_client():
+    """Return the shared OpenAI client, creating it on first use."""
+    global _OPENAI_CLIENT
+    if _OPENAI_CLIENT is None:
+        api_key = getattr(settings, 'OPENAI_API_KEY', None)
+        if not api_key:
+            raise ValueError("OpenAI API key not configured in settings")
+        _OPENAI_CLIENT = OpenAI(api_key=api_key, max_retries=_OPENAI_MAX_RETRIES, timeout=_OPENAI_TIMEOUT)
+    return _OPENAI_CLIENT
+
+
+def encode_image_for_openai(image):
+    """Downscale a PIL image to the OpenAI size budget and return it as base64 JPEG."""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail((OPENAI_MAX_IMAGE_EDGE, OPENAI_MAX_IMAGE_EDGE), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=OPENAI_JPEG_QUALITY, optimize=True)
+    # Encode straight from the buffer's memory rather than a getvalue() copy of the JPEG
+    return base64.b64encode(buffer.getbuffer()).decode('ascii')
+
+
+def ensure_budgeted_image(file_content):
+    """
+    Return (base64 data, mime type) for an uploaded JPG/PNG, passing it through
+    untouched when it already fits the OpenAI size budget.
+    """
+    image = Image.open(BytesIO(file_content))  # Lazy: only the header is read here
+    mime_type = Image.MIME.get(image.format)
+    if (
+        mime_type in ('image/jpeg', 'image/png')
+        and len(file_content) <= OPENAI_PASSTHROUGH_MAX_BYTES
+        and max(image.size) <= OPENAI_MAX_IMAGE_EDGE
+    ):
+        return base64.b64encode(file_content).decode('ascii'), mime_type
+
+    return encode_image_for_openai(image), "image/jpeg"
+
+
+# ============================================================================
+# Bill files
+# ============================================================================
+
+# Split PDFs are rendered by this many poppler processes, each taking a page range.
+PDF_RENDER_THREADS = min(4, os.cpu_count() or 1)
+# Bills created from one upload are inserted this many rows per INSERT.
+BILL_BULK_CREATE_BATCH_SIZE = 50
+
+
+def delete_bill_file_on_commit(bill_file):
+    """
+    Delete a bill's file through its storage backend (local disk or remote) after the
+    surrounding transaction commits, so a rolled-back delete never loses the file.
+    """
+    if not bill_file:
+        return
+
+    def _delete():
+        try:
+            bill_file.delete(save=False)
+        except Exception as e:
+            logger.warning(f"Could not delete file {bill_file}: {str(e)}")
+
+    transaction.on_commit(_delete)
+
+
+def discard_stored_bill_files(bills):
+    """
+    Delete the files already stored for bills whose rows were never inserted, so a failed
+    upload does not leave orphaned files in storage.
+    """
+    for bill in bills:
+        try:
+            bill.file.delete(save=False)
+        except Exception as e:
+            logger.warning(f"Could not delete orphaned file {bill.file}: {str(e)}")
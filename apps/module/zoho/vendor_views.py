@@ -1,31 +1,33 @@
 # apps/module/zoho/vendor_views.py
 
-import base64
+import hashlib
 import json
 import logging
 import os
 import random
+import re
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from decimal import Decimal
-from io import BytesIO
+from decimal import Decimal, InvalidOperation
 
 import requests
-from PyPDF2 import PdfReader
-from django.conf import settings
-from django.core.files.base import ContentFile
-from django.db import transaction
-from django.db.models.functions import Lower
-from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema
-from openai import OpenAI
-from pdf2image import convert_from_bytes
+from django.core.cache import cache
+from django.core.files import File
+from django.db import connection, transaction
+from django.http import Http404
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from pdf2image import convert_from_bytes, convert_from_path
+from PIL import ImageEnhance
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.common.pagination import DefaultPagination
+from apps.common.pagination import CreatedAtCursorPagination, DefaultPagination
 from apps.organizations.models import Organization
 from .models import (
     ZohoCredentials,
@@ -36,6 +38,8 @@ from .models import (
 )
 from .serializers.common import (
     AnalysisResponseSerializer,
+    BulkAnalysisResponseSerializer,
+    VerifyResponseSerializer,
 )
 from .serializers.vendor_bills import (
     ZohoVendorBillSerializer,
@@ -43,200 +47,278 @@ from .serializers.vendor_bills import (
     VendorZohoBillSerializer,
     ZohoVendorBillUploadSerializer,
     ZohoVendorBillMultipleUploadSerializer,
+    ZohoVendorBillBulkAnalyzeSerializer,
+)
+from .utils import (
+    BILL_BULK_CREATE_BATCH_SIZE,
+    OPENAI_MAX_IMAGE_EDGE,
+    PDF_RENDER_THREADS,
+    ZOHO_API_SESSION,
+    ZOHO_API_TIMEOUT,
+    delete_bill_file_on_commit,
+    discard_stored_bill_files,
+    encode_image_for_openai,
+    ensure_budgeted_image,
+    get_zoho_access_token,
+    openai_client,
+    refresh_zoho_access_token,
+    zoho_response_body,
 )
 
 logger = logging.getLogger(__name__)
 
+# Several PDFs in one upload are split side by side; most of the time goes to
+# waiting on poppler and on storage writes, so threads are enough.
+_PDF_SPLIT_WORKERS = 4
+
+# Concurrency cap for real-time analysis of several bills.
+_OPENAI_MAX_WORKERS = 10
+_OPENAI_MODEL = 'gpt-4o'
+
+# Runs analyses requested with ?background=true off the request thread. A cache
+# lock per bill keeps repeated requests from analysing the same bill twice.
+_ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=_OPENAI_MAX_WORKERS, thread_name_prefix='vendor-bill-analysis')
+_ANALYSIS_LOCK_TIMEOUT = 10 * 60
+
+# First number in an analysed value, e.g. "Rs. 1,250.00" -> 1250.00 once commas are dropped
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+# Enhanced prompt for Indian invoices (from successful test script)
+_INVOICE_PROMPT = """
+Analyze this invoice/bill image carefully and extract ALL visible information in JSON format.
+This appears to be an Indian business invoice/bill. Look for:
+
+1. Invoice/Bill Number (may be labeled as Invoice No, Bill No, Receipt No, etc.)
+2. Dates (Invoice Date, Bill Date, Due Date - convert to YYYY-MM-DD format)
+3. Vendor/Company details in "from" section (name and address)
+4. Customer details in "to" section (name and address) 
+5. Line items with descriptions, quantities, and prices
+6. Tax amounts (IGST, CGST, SGST - look for percentages and amounts)
+7. Total amount (may include terms like "Total", "Grand Total", "Amount Payable")
+
+IMPORTANT RULES:
+- Extract EXACT text as it appears on the document
+- For numbers, remove currency symbols (₹, Rs.) and commas
+- If any field is not visible or unclear, use empty string "" or 0 for numbers
+- Look carefully at the entire document, including headers, footers, and margins
+- Pay special attention to tax sections which may be in tables or separate areas
+"""
+
+_INVOICE_PARTY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "address": {"type": "string"},
+    },
+    "required": ["name", "address"],
+    "additionalProperties": False,
+}
+
+# Structured Outputs schema for the analysis response; OpenAI guarantees the
+# returned JSON matches it, so the shape no longer has to be spelled out in the prompt.
+_INVOICE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "invoiceNumber": {"type": "string", "description": "Invoice/Bill number as shown on document"},
+        "dateIssued": {"type": "string", "description": "Invoice/Bill date in YYYY-MM-DD format"},
+        "dueDate": {"type": "string", "description": "Due date in YYYY-MM-DD format if mentioned"},
+        "from": {**_INVOICE_PARTY_SCHEMA, "description": "Vendor/Company issuing the bill"},
+        "to": {**_INVOICE_PARTY_SCHEMA, "description": "Customer receiving the bill"},
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string", "description": "Item/Service description"},
+                    "quantity": {"type": "number"},
+                    "price": {"type": "number"},
+                },
+                "required": ["description", "quantity", "price"],
+                "additionalProperties": False,
+            },
+        },
+        "total": {"type": "number"},
+        "igst": {"type": "number"},
+        "cgst": {"type": "number"},
+        "sgst": {"type": "number"},
+    },
+    "required": ["invoiceNumber", "dateIssued", "dueDate", "from", "to", "items", "total", "igst", "cgst", "sgst"],
+    "additionalProperties": False,
+}
+
+# Successful analyses are cached by file content, so re-uploads and retries of the
+# same bill skip the OpenAI call. The version changes whenever the model, prompt,
+# schema or image size does, which retires entries produced under the old settings.
+_ANALYSIS_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+_ANALYSIS_CACHE_VERSION = hashlib.sha256(
+    json.dumps([_OPENAI_MODEL, _INVOICE_PROMPT, _INVOICE_SCHEMA, OPENAI_MAX_IMAGE_EDGE], sort_keys=True).encode('utf-8')
+).hexdigest()[:16]
+
 
 # ============================================================================
 # Helper Functions
 # ============================================================================
 
 def get_organization_from_request(request, **kwargs):
-    """Get organization from URL org_id parameter, API key, or user membership."""
-    # First check for org_id in URL kwargs (organization-scoped endpoints)
+    """
+    Get organization from URL org_id parameter, API key, or user membership.
+    The result is memoized on the request, so repeated calls within one request are free.
+    """
     org_id = kwargs.get('org_id')
+    memo = getattr(request, '_cached_organizations', None)
+    if memo is None:
+        memo = request._cached_organizations = {}
+    if org_id in memo:
+        return memo[org_id]
+
+    memo[org_id] = organization = _resolve_organization(request, org_id)
+    return organization
+
+
+def _resolve_organization(request, org_id):
+    # First check for org_id in URL kwargs (organization-scoped endpoints)
     if org_id:
-        return get_object_or_404(Organization, id=org_id)
+        # Shared across requests, so list -> detail -> verify -> sync fetch the row once
+        organization = Organization.cached(org_id)
+        if organization is None:
+            raise Http404("No Organization matches the given query.")
+        return organization
 
     # Check for API key authentication
     if hasattr(request, 'auth') and request.auth:
         from apps.organizations.models import OrganizationAPIKey
-        try:
-            org_api_key = OrganizationAPIKey.objects.get(api_key=request.auth)
-            return org_api_key.organization
-        except OrganizationAPIKey.DoesNotExist:
-            pass
+        organization = OrganizationAPIKey.organization_for_key(request.auth)
+        if organization:
+            return organization
 
     # Fallback to user membership
     if hasattr(request.user, 'memberships'):
-        membership = request.user.memberships.filter(is_active=True).first()
+        membership = request.user.memberships.select_related('organization').filter(is_active=True).first()
         if membership:
             return membership.organization
     return None
 
 
-def analyze_vendor_bill_with_openai(file_content, file_extension):
-    """
-    Analyze vendor bill content using OpenAI to extract structured data with enhanced PDF handling.
-    Supports PDF, JPG, PNG file formats with robust validation and optimization.
-    """
-    logger.info(f"Starting enhanced vendor bill analysis for file type: {file_extension}")
-
-    try:
-        # Initialize OpenAI client
-        api_key = getattr(settings, 'OPENAI_API_KEY', None)
-        if not api_key:
-            raise ValueError("OpenAI API key not configured in settings")
+def _parse_number(value, cast=Decimal):
+    """Parse a number out of an analysed value without raising; anything unparseable is 0."""
+    match = _NUMBER_RE.search(str(value).replace(',', '')) if value is not None else None
+    return cast(Decimal(match.group(0))) if match else cast(0)
 
-        client = OpenAI(api_key=api_key)
 
-        # Prepare image data based on file type with enhanced processing
-        if file_extension.lower() == 'pdf':
-            logger.info(f"Processing PDF file with enhanced settings...")
+def _numeric_string(value, default='0'):
+    """Return an analysed number as the string stored on the bill, or default when it is not numeric."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return str(value)
+    value = str(value)
+    try:
+        Decimal(value)  # Validate it's numeric
+    except InvalidOperation:
+        logger.warning(f"Invalid numeric value: {value}, using default: {default}")
+        return default
+    return value
 
-            file_size = len(file_content)
-            logger.info(f"PDF loaded: {file_size:,} bytes")
 
-            # Enhanced PDF validation
-            if not file_content.startswith(b'%PDF'):
-                raise ValueError("Invalid PDF file format")
+def _prepare_vendor_bill_image(file_content, file_extension):
+    """
+    Convert a vendor bill file into the base64 image payload sent to OpenAI.
+    Returns an (image_data, mime_type) tuple; raises ValueError for unusable files.
+    """
+    # Prepare image data based on file type with enhanced processing
+    if file_extension.lower() == 'pdf':
+        logger.info(f"Processing PDF file with enhanced settings...")
 
-            if file_size < 100:
-                raise ValueError("PDF file too small (possibly corrupted)")
+        file_size = len(file_content)
+        logger.info(f"PDF loaded: {file_size:,} bytes")
 
-            logger.info("PDF validation passed")
+        # Enhanced PDF validation
+        if not file_content.startswith(b'%PDF'):
+            raise ValueError("Invalid PDF file format")
 
-            # Convert PDF to image with enhanced settings
-            try:
-                from PIL import Image, ImageEnhance
-
-                logger.info("Converting PDF to image with enhanced settings...")
-                images = convert_from_bytes(
-                    file_content,
-                    first_page=1,
-                    last_page=1,
-                    dpi=200,  # Good balance of quality vs speed
-                    fmt='jpeg'
-                )
+        if file_size < 100:
+            raise ValueError("PDF file too small (possibly corrupted)")
 
-                if not images:
-                    raise ValueError("No images generated from PDF")
+        logger.info("PDF validation passed")
 
-                image = images[0]
-                logger.info(f"PDF converted successfully - Image size: {image.size}, Mode: {image.mode}")
-
-                # Enhanced image optimization for OCR
-                logger.info("Optimizing image for OCR...")
+        # Convert PDF to image with enhanced settings
+        try:
+            logger.info("Converting PDF to image with enhanced settings...")
+            # pdftoppm renders the page straight at the target size (long edge),
+            # so no oversized bitmap is ever allocated
+            images = convert_from_bytes(
+                file_content,
+                first_page=1,
+                last_page=1,
+                fmt='jpeg',
+                size=OPENAI_MAX_IMAGE_EDGE
+            )
 
-                # Convert to RGB if needed
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
+            if not images:
+                raise ValueError("No images generated from PDF")
 
-                # Enhance for better OCR
-                enhancer = ImageEnhance.Contrast(image)
-                image = enhancer.enhance(1.2)
+            image = images[0]
+            del images
+            logger.info(f"PDF converted successfully - Image size: {image.size}, Mode: {image.mode}")
 
-                enhancer = ImageEnhance.Sharpness(image)
-                image = enhancer.enhance(1.1)
+            # Enhanced image optimization for OCR
+            logger.info("Optimizing image for OCR...")
 
-                # Ensure minimum size for better OCR accuracy
-                width, height = image.size
-                if width < 1000 or height < 1000:
-                    scale = max(1000 / width, 1000 / height)
-                    new_size = (int(width * scale), int(height * scale))
-                    image = image.resize(new_size, Image.Resampling.LANCZOS)
-                    logger.info(f"Image upscaled to: {new_size}")
+            # Convert to RGB if needed
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
 
-                logger.info("Image optimization completed")
+            # Enhance for better OCR
+            enhancer = ImageEnhance.Contrast(image)
+            image = enhancer.enhance(1.2)
 
-                # Convert PIL image to base64
-                buffer = BytesIO()
-                image.save(buffer, format='JPEG', quality=95)
-                image_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                mime_type = "image/jpeg"
-                logger.info(f"Base64 conversion completed: {len(image_data):,} characters")
+            enhancer = ImageEnhance.Sharpness(image)
+            image = enhancer.enhance(1.1)
 
-            except Exception as e:
-                logger.error(f"Enhanced PDF conversion failed: {str(e)}")
-                raise ValueError(f"PDF conversion failed: {str(e)}")
+            logger.info("Image optimization completed")
 
-        elif file_extension.lower() in ['jpg', 'jpeg', 'png']:
-            # Handle image files with MIME type detection
-            logger.info(f"Processing image file: {file_extension}")
+            # Downscale and convert PIL image to base64, releasing the bitmap before the API call
+            image_data = encode_image_for_openai(image)
+            image.close()
+            mime_type = "image/jpeg"
+            logger.info(f"Base64 conversion completed: {len(image_data):,} characters")
 
-            if file_extension.lower() in ['jpg', 'jpeg']:
-                mime_type = "image/jpeg"
-            elif file_extension.lower() == 'png':
-                mime_type = "image/png"
-            else:
-                mime_type = "image/jpeg"  # Default fallback
+        except Exception as e:
+            logger.error(f"Enhanced PDF conversion failed: {str(e)}")
+            raise ValueError(f"PDF conversion failed: {str(e)}")
 
-            image_data = base64.b64encode(file_content).decode('utf-8')
-            logger.info(f"Successfully processed image with MIME type: {mime_type}")
+    elif file_extension.lower() in ['jpg', 'jpeg', 'png']:
+        # Handle image files with MIME type detection
+        logger.info(f"Processing image file: {file_extension}")
 
-        else:
-            raise ValueError(f"Unsupported file format: {file_extension}")
+        # Oversized uploads are re-encoded as bounded JPEG; small ones pass through
+        image_data, mime_type = ensure_budgeted_image(file_content)
+        logger.info(f"Successfully processed image with MIME type: {mime_type}")
 
-        # Enhanced prompt for Indian invoices (from successful test script)
-        enhanced_prompt = """
-        Analyze this invoice/bill image carefully and extract ALL visible information in JSON format.
-        This appears to be an Indian business invoice/bill. Look for:
-        
-        1. Invoice/Bill Number (may be labeled as Invoice No, Bill No, Receipt No, etc.)
-        2. Dates (Invoice Date, Bill Date, Due Date - convert to YYYY-MM-DD format)
-        3. Vendor/Company details in "from" section (name and address)
-        4. Customer details in "to" section (name and address) 
-        5. Line items with descriptions, quantities, and prices
-        6. Tax amounts (IGST, CGST, SGST - look for percentages and amounts)
-        7. Total amount (may include terms like "Total", "Grand Total", "Amount Payable")
-        
-        IMPORTANT RULES:
-        - Extract EXACT text as it appears on the document
-        - For numbers, remove currency symbols (₹, Rs.) and commas
-        - If any field is not visible or unclear, use empty string "" or 0 for numbers
-        - Look carefully at the entire document, including headers, footers, and margins
-        - Pay special attention to tax sections which may be in tables or separate areas
-        
-        Return data in this JSON structure:
-        {
-            "invoiceNumber": "Invoice/Bill number as shown on document",
-            "dateIssued": "Invoice/Bill date in YYYY-MM-DD format",
-            "dueDate": "Due date in YYYY-MM-DD format if mentioned",
-            "from": {
-                "name": "Vendor/Company name",
-                "address": "Vendor address"
-            },
-            "to": {
-                "name": "Customer name", 
-                "address": "Customer address"
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}")
+
+    return image_data, mime_type
+
+
+def _build_vendor_bill_request(image_data, mime_type):
+    """Build the chat.completions request body used for vendor bill analysis."""
+    return {
+        "model": _OPENAI_MODEL,
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": "Invoice", "schema": _INVOICE_SCHEMA, "strict": True},
+        },
+        # The fixed instructions go first, in their own message, so every request shares
+        # the same prefix and OpenAI's automatic prompt caching can reuse it
+        "messages": [
+            {
+                "role": "system",
+                "content": _INVOICE_PROMPT
             },
-            "items": [
-                {
-                    "description": "Item/Service description",
-                    "quantity": 0,
-                    "price": 0
-                }
-            ],
-            "total": 0,
-            "igst": 0,
-            "cgst": 0,
-            "sgst": 0
-        }
-        """
-
-        # Enhanced OpenAI API call with better settings
-        logger.info("Sending request to OpenAI API...")
-        response = client.chat.completions.create(
-            model='gpt-4o',
-            response_format={"type": "json_object"},
-            messages=[{
+            {
                 "role": "user",
                 "content": [
-                    {
-                        "type": "text",
-                        "text": enhanced_prompt
-                    },
                     {
                         "type": "image_url",
                         "image_url": {
@@ -245,36 +327,249 @@ def analyze_vendor_bill_with_openai(file_content, file_extension):
                         }
                     }
                 ]
-            }],
-            max_tokens=2000,  # Increased token limit
-            temperature=0.1   # Lower temperature for more consistent results
-        )
+            }
+        ],
+        "max_tokens": 2000,  # Increased token limit
+        "temperature": 0.1,  # Lower temperature for more consistent results
+    }
+
+
+def _failed_vendor_bill_analysis(error):
+    """Empty analysis result returned when OpenAI analysis fails."""
+    return {
+        "invoiceNumber": "",
+        "dateIssued": "",
+        "dueDate": "",
+        "from": {"name": "", "address": ""},
+        "to": {"name": "", "address": ""},
+        "items": [],
+        "total": 0,
+        "igst": 0,
+        "cgst": 0,
+        "sgst": 0,
+        "error": f"Analysis failed: {error}"
+    }
+
+
+def _analysis_cache_key(file_content, file_extension):
+    digest = hashlib.sha256(file_content).hexdigest()
+    return f"zoho:vendor_bill_openai:{_ANALYSIS_CACHE_VERSION}:{file_extension.lower()}:{digest}"
+
+
+def analyze_vendor_bill_with_openai(file_content, file_extension):
+    """
+    Analyze vendor bill content using OpenAI to extract structured data with enhanced PDF handling.
+    Supports PDF, JPG, PNG file formats with robust validation and optimization.
+    file_content may be bytes or an open file; passing the file lets the raw upload
+    be released as soon as it has been converted.
+
+    This is the real-time path used by user-triggered analysis; bulk back-office
+    ingestion should go through submit_vendor_bills_batch instead.
+    """
+    logger.info(f"Starting enhanced vendor bill analysis for file type: {file_extension}")
+
+    try:
+        client = openai_client()
+
+        if hasattr(file_content, 'read'):
+            # Close the storage handle as soon as its bytes are in memory
+            with file_content:
+                file_content.seek(0)
+                file_content = file_content.read()
+
+        cache_key = _analysis_cache_key(file_content, file_extension)
+        json_data = cache.get(cache_key)
+        if json_data is not None:
+            logger.info("Using cached analysis for identical bill content")
+            return json_data
+
+        image_data, mime_type = _prepare_vendor_bill_image(file_content, file_extension)
+        request_body = _build_vendor_bill_request(image_data, mime_type)
+        # Only the request body is needed from here on; drop the raw upload and the
+        # standalone base64 copy so they are not held for the length of the API call
+        del file_content, image_data
+
+        # Enhanced OpenAI API call with better settings
+        logger.info("Sending request to OpenAI API...")
+        response = client.chat.completions.create(**request_body)
 
         if not response.choices or not response.choices[0].message.content:
             raise ValueError("Empty response from OpenAI API")
 
         logger.info("Successfully received response from OpenAI API")
-        logger.info(f"Raw OpenAI response: {response.choices[0].message.content}")
+        # Debug only and formatted lazily: the full payload is large and rarely needed
+        logger.debug("Raw OpenAI response: %s", response.choices[0].message.content)
 
         json_data = json.loads(response.choices[0].message.content)
-        logger.info(f"Successfully parsed analyzed data: {json_data}")
+        logger.debug("Successfully parsed analyzed data: %s", json_data)
+        # Failures are never cached, so a retry always reaches OpenAI again
+        cache.set(cache_key, json_data, _ANALYSIS_CACHE_TIMEOUT)
         return json_data
 
     except Exception as e:
         logger.error(f"Error in enhanced vendor bill analysis: {str(e)}")
-        return {
-            "invoiceNumber": "",
-            "dateIssued": "",
-            "dueDate": "",
-            "from": {"name": "", "address": ""},
-            "to": {"name": "", "address": ""},
-            "items": [],
-            "total": 0,
-            "igst": 0,
-            "cgst": 0,
-            "sgst": 0,
-            "error": f"Analysis failed: {str(e)}"
-        }
+        return _failed_vendor_bill_analysis(str(e))
+
+
+
+def analyze_vendor_bills_parallel(file_tuples):
+    """
+    Analyze several (file_content or open file, file_extension) tuples concurrently.
+    Results are returned in input order; failures come back as error payloads
+    exactly like analyze_vendor_bill_with_openai.
+    """
+    if not file_tuples:
+        return []
+
+    max_workers = min(_OPENAI_MAX_WORKERS, len(file_tuples))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda args: analyze_vendor_bill_with_openai(*args), file_tuples))
+
+def _analysis_lock_key(bill_id):
+    return f"zoho:vendor_bill_analysis:{bill_id}"
+
+
+def queue_vendor_bill_analysis(bill_id):
+    """
+    Queue a Draft bill for analysis on _ANALYSIS_EXECUTOR once the current transaction commits.
+    Returns False when an analysis of the bill is already in progress.
+    """
+    if not cache.add(_analysis_lock_key(bill_id), "1", _ANALYSIS_LOCK_TIMEOUT):
+        return False
+    transaction.on_commit(lambda: _ANALYSIS_EXECUTOR.submit(analyze_and_persist_vendor_bill, bill_id))
+    return True
+
+
+def analyze_and_persist_vendor_bill(bill_id):
+    """
+    Analyze a Draft vendor bill and store the results; runs on _ANALYSIS_EXECUTOR.
+    Bills that left Draft in the meantime are left untouched.
+    """
+    try:
+        bill = VendorBill.objects.select_related('organization').get(id=bill_id)
+        if bill.status != 'Draft':
+            return
+
+        analyzed_data = bill.prior_analysis()
+        if analyzed_data is None:
+            file_extension = bill.file.name.split('.')[-1].lower()
+            analyzed_data = analyze_vendor_bill_with_openai(bill.file.open('rb'), file_extension)
+
+        with transaction.atomic():
+            bill.analysed_data = analyzed_data
+            bill.status = 'Analysed'
+            bill.process = True
+            bill.save(update_fields=["analysed_data", "status", "process", "update_at"])
+            create_vendor_zoho_objects_from_analysis(bill, analyzed_data, bill.organization)
+    except Exception as e:
+        logger.error(f"Background analysis failed for vendor bill {bill_id}: {str(e)}")
+    finally:
+        cache.delete(_analysis_lock_key(bill_id))
+        # Worker threads hold their own DB connection; hand it back after each job
+        connection.close()
+
+
+def submit_vendor_bills_batch(bills):
+    """
+    Submit Draft vendor bills to the OpenAI Batch API for asynchronous analysis.
+
+    Each bill becomes one JSONL request keyed by its id. Bills whose file cannot be
+    prepared are skipped. The batch id is stored on the submitted bills so that
+    collect_vendor_bills_batch can pick up the results later.
+    Returns the created batch, or None when nothing was submitted.
+    """
+    client = openai_client()
+
+    lines = []
+    submitted = []
+    for bill in bills:
+        try:
+            with bill.file.open('rb') as bill_file:
+                file_content = bill_file.read()
+            file_extension = bill.file.name.split('.')[-1].lower()
+            image_data, mime_type = _prepare_vendor_bill_image(file_content, file_extension)
+        except Exception as e:
+            logger.error(f"Skipping vendor bill {bill.id} in batch submission: {str(e)}")
+            continue
+
+        lines.append(json.dumps({
+            "custom_id": str(bill.id),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": _build_vendor_bill_request(image_data, mime_type),
+        }))
+        submitted.append(bill.id)
+
+    if not lines:
+        return None
+
+    input_file = client.files.create(
+        file=("vendor_bills.jsonl", "\n".join(lines).encode('utf-8')),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata={"source": "vendor_bills"}
+    )
+
+    VendorBill.objects.filter(id__in=submitted).update(openai_batch_id=batch.id)
+    logger.info(f"Submitted {len(submitted)} vendor bills to OpenAI batch {batch.id}")
+    return batch
+
+
+def collect_vendor_bills_batch(batch_id):
+    """
+    Apply the results of a finished OpenAI batch to the vendor bills it covers.
+
+    Only bills still in Draft are updated, so bills analysed in real time while the
+    batch was pending are left alone. Batches that failed, expired or were cancelled
+    release their bills for resubmission.
+    Returns the batch status, or None while the batch is still running.
+    """
+    client = openai_client()
+    batch = client.batches.retrieve(batch_id)
+
+    if batch.status in ('failed', 'expired', 'cancelled'):
+        VendorBill.objects.filter(openai_batch_id=batch_id).update(openai_batch_id=None)
+        logger.warning(f"OpenAI batch {batch_id} ended with status {batch.status}")
+        return batch.status
+
+    if batch.status != 'completed':
+        return None
+
+    results = {}
+    if batch.output_file_id:
+        output = client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            try:
+                content = result["response"]["body"]["choices"][0]["message"]["content"]
+                results[result["custom_id"]] = json.loads(content)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                results[result["custom_id"]] = _failed_vendor_bill_analysis(str(e))
+
+    bills = VendorBill.objects.select_related('organization').filter(openai_batch_id=batch_id)
+    for bill in bills:
+        if bill.status != 'Draft':
+            continue
+
+        analyzed_data = results.get(str(bill.id), _failed_vendor_bill_analysis("No result in batch output"))
+        try:
+            with transaction.atomic():
+                bill.analysed_data = analyzed_data
+                bill.status = 'Analysed'
+                bill.process = True
+                bill.save(update_fields=["analysed_data", "status", "process", "update_at"])
+                create_vendor_zoho_objects_from_analysis(bill, analyzed_data, bill.organization)
+        except Exception as e:
+            logger.error(f"Failed to apply batch result to vendor bill {bill.id}: {str(e)}")
+
+    bills.update(openai_batch_id=None)
+    return batch.status
 
 
 def create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization):
@@ -283,30 +578,13 @@ def create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization):
     """
     logger.info(f"Creating Vendor Zoho objects for bill {bill.id} with analyzed data: {analyzed_data}")
 
-    # Process analyzed data based on schema format
-    if "properties" in analyzed_data:
-        relevant_data = {
-            "invoiceNumber": analyzed_data["properties"]["invoiceNumber"]["const"],
-            "dateIssued": analyzed_data["properties"]["dateIssued"]["const"],
-            "dueDate": analyzed_data["properties"]["dueDate"]["const"],
-            "from": analyzed_data["properties"]["from"]["properties"],
-            "to": analyzed_data["properties"]["to"]["properties"],
-            "items": [{"description": item["description"]["const"], "quantity": item["quantity"]["const"],
-                       "price": item["price"]["const"]} for item in analyzed_data["properties"]["items"]["items"]],
-            "total": analyzed_data["properties"]["total"]["const"],
-            "igst": analyzed_data["properties"]["igst"]["const"],
-            "cgst": analyzed_data["properties"]["cgst"]["const"],
-            "sgst": analyzed_data["properties"]["sgst"]["const"],
-        }
-    else:
-        relevant_data = analyzed_data
+    relevant_data = analyzed_data
 
     # Try to find vendor by company name (case-insensitive search)
     vendor = None
     company_name = relevant_data.get('from', {}).get('name', '').strip().lower()
     if company_name:
-        vendor = ZohoVendor.objects.annotate(lower_name=Lower('companyName')).filter(
-            lower_name=company_name).first()
+        vendor = ZohoVendor.lookup_by_name(organization, company_name)
         logger.info(f"Found vendor by name {company_name}: {vendor}")
 
     # Parse bill date
@@ -327,19 +605,6 @@ def create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization):
         except (ValueError, TypeError):
             logger.warning(f"Could not parse due date: {due_date_issued}")
 
-    # Validate numeric fields and convert to string
-    def safe_numeric_string(value, default='0'):
-        try:
-            if value is None:
-                return default
-            if isinstance(value, (int, float)):
-                return str(value)
-            float(str(value))  # Validate it's numeric
-            return str(value)
-        except (ValueError, TypeError):
-            logger.warning(f"Invalid numeric value: {value}, using default: {default}")
-            return default
-
     # Create or update VendorZohoBill
     try:
         zoho_bill, created = VendorZohoBill.objects.get_or_create(
@@ -350,10 +615,10 @@ def create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization):
                 'bill_no': relevant_data.get('invoiceNumber', ''),
                 'bill_date': bill_date,
                 'due_date': due_date,
-                'total': safe_numeric_string(relevant_data.get('total')),
-                'igst': safe_numeric_string(relevant_data.get('igst')),
-                'cgst': safe_numeric_string(relevant_data.get('cgst')),
-                'sgst': safe_numeric_string(relevant_data.get('sgst')),
+                'total': _numeric_string(relevant_data.get('total')),
+                'igst': _numeric_string(relevant_data.get('igst')),
+                'cgst': _numeric_string(relevant_data.get('cgst')),
+                'sgst': _numeric_string(relevant_data.get('sgst')),
                 'discount_type': 'Percentage',
                 'discount_amount': Decimal('0'),
                 'adjustment_amount': Decimal('0'),
@@ -365,51 +630,69 @@ def create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization):
             logger.info(f"Created new VendorZohoBill: {zoho_bill.id}")
         else:
             logger.info(f"Found existing VendorZohoBill: {zoho_bill.id}")
-            # Update the existing bill with new analyzed data
-            zoho_bill.vendor = vendor
-            zoho_bill.bill_no = relevant_data.get('invoiceNumber', zoho_bill.bill_no)
-            zoho_bill.bill_date = bill_date or zoho_bill.bill_date
-            zoho_bill.due_date = due_date or zoho_bill.due_date
-            zoho_bill.total = safe_numeric_string(relevant_data.get('total'), zoho_bill.total)
-            zoho_bill.igst = safe_numeric_string(relevant_data.get('igst'), zoho_bill.igst)
-            zoho_bill.cgst = safe_numeric_string(relevant_data.get('cgst'), zoho_bill.cgst)
-            zoho_bill.sgst = safe_numeric_string(relevant_data.get('sgst'), zoho_bill.sgst)
-            zoho_bill.note = f"Updated from analysis for {company_name or 'Unknown Vendor'}"
-            zoho_bill.save()
+            # Update only the analysed columns of the existing bill in a single UPDATE
+            updates = {
+                'vendor': vendor,
+                'bill_no': relevant_data.get('invoiceNumber', zoho_bill.bill_no),
+                'bill_date': bill_date or zoho_bill.bill_date,
+                'due_date': due_date or zoho_bill.due_date,
+                'total': _numeric_string(relevant_data.get('total'), zoho_bill.total),
+                'igst': _numeric_string(relevant_data.get('igst'), zoho_bill.igst),
+                'cgst': _numeric_string(relevant_data.get('cgst'), zoho_bill.cgst),
+                'sgst': _numeric_string(relevant_data.get('sgst'), zoho_bill.sgst),
+                'note': f"Updated from analysis for {company_name or 'Unknown Vendor'}",
+            }
+            VendorZohoBill.objects.filter(pk=zoho_bill.pk).update(**updates)
+            for field, value in updates.items():
+                setattr(zoho_bill, field, value)
             logger.info(f"Updated existing VendorZohoBill: {zoho_bill.id}")
 
-        # Delete existing products and recreate them
-        existing_products_count = zoho_bill.products.count()
-        if existing_products_count > 0:
-            zoho_bill.products.all().delete()
-            logger.info(f"Deleted {existing_products_count} existing products")
-
-        # Create VendorZohoProduct objects for each item
+        # Build product field values for each item
         items = relevant_data.get('items', [])
         logger.info(f"Creating {len(items)} product line items")
 
-        created_products = []
+        product_values = []
         for idx, item in enumerate(items):
-            try:
-                rate = Decimal(item.get('price', 0) or 0)
-                quantity = int(item.get('quantity', 0) or 0)
-                amount = rate * quantity
+            rate = _parse_number(item.get('price'))
+            quantity = _parse_number(item.get('quantity'), int)
+            description = item.get('description') or f'Item {idx + 1}'
+            product_values.append({
+                'item_name': description[:100],
+                'item_details': description[:200],
+                'rate': str(rate),
+                'quantity': str(quantity),
+                'amount': str(rate * quantity),
+            })
+
+        # Reuse existing product rows by position: update only the ones whose values
+        # changed, insert the extra items and delete the surplus tail.
+        product_fields = ['item_name', 'item_details', 'rate', 'quantity', 'amount']
+        existing = list(zoho_bill.products.order_by('created_at', 'id'))
+        to_update = []
+        to_create = []
+        for idx, values in enumerate(product_values):
+            if idx < len(existing):
+                product = existing[idx]
+                if any(getattr(product, field) != values[field] for field in product_fields):
+                    for field in product_fields:
+                        setattr(product, field, values[field])
+                    to_update.append(product)
+            else:
+                to_create.append(VendorZohoProduct(zohoBill=zoho_bill, organization=organization, **values))
+        surplus_ids = [product.pk for product in existing[len(product_values):]]
 
-                product = VendorZohoProduct.objects.create(
-                    zohoBill=zoho_bill,
-                    organization=organization,
-                    item_name=item.get('description', f'Item {idx + 1}')[:100],
-                    item_details=item.get('description', f'Item {idx + 1}')[:200],
-                    rate=str(rate),
-                    quantity=str(quantity),
-                    amount=str(amount)
-                )
-                created_products.append(product)
-                logger.info(
-                    f"Created product {idx + 1}: {product.item_name} - Rate: {product.rate}, Qty: {product.quantity}, Amount: {product.amount}")
-            except Exception as e:
-                logger.error(f"Error creating product {idx + 1}: {str(e)}")
-                continue
+        with transaction.atomic():
+            if to_update:
+                VendorZohoProduct.objects.bulk_update(to_update, product_fields, batch_size=500)
+            if to_create:
+                VendorZohoProduct.objects.bulk_create(to_create, batch_size=500)
+            if surplus_ids:
+                VendorZohoProduct.objects.filter(pk__in=surplus_ids).delete()
+
+        logger.info(
+            f"Products for bill {zoho_bill.id}: {len(to_update)} updated, "
+            f"{len(to_create)} created, {len(surplus_ids)} deleted")
+        created_products = existing[:len(product_values)] + to_create
 
         logger.info(f"Successfully created {len(created_products)} products for bill {zoho_bill.id}")
         return zoho_bill
@@ -419,66 +702,56 @@ def create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization):
         raise
 
 
-def refresh_zoho_access_token(current_token):
-    """Refresh Zoho access token using refresh token."""
-    refresh_token = current_token.refreshToken
-    client_id = current_token.clientId
-    client_secret = current_token.clientSecret
-
-    url = f"https://accounts.zoho.in/oauth/v2/token?refresh_token={refresh_token}&client_id={client_id}&client_secret={client_secret}&grant_type=refresh_token"
-
-    try:
-        response = requests.post(url)
-        if response.status_code == 200:
-            new_access_token = response.json().get('access_token')
-            current_token.accessToken = new_access_token
-            current_token.save()
-            return new_access_token
-        else:
-            logger.error(f"Failed to refresh token: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        logger.error(f"Error refreshing token: {str(e)}")
-        return None
-
-
-def process_pdf_splitting_vendor(pdf_file, organization, file_type, uploaded_by):
-    """Split PDF into individual pages and create separate vendor bills"""
+def split_vendor_pdf_pages(pdf_file, organization, file_type, uploaded_by):
+    """
+    Split a PDF into one unsaved vendor bill per page, with each page image already stored.
+    Runs no queries, so several PDFs can be split on worker threads; the caller names the
+    bills and inserts the rows.
+    """
     created_bills = []
 
     try:
-        pdf_file.seek(0)
-        pdf_bytes = pdf_file.read()
-        pdf = PdfReader(BytesIO(pdf_bytes))
-        unique_id = datetime.now().strftime("%Y%m%d%H%M%S")
-
-        for page_num in range(len(pdf.pages)):
-            # Convert PDF page to image
-            page_images = convert_from_bytes(
-                pdf_bytes,
-                first_page=page_num + 1,
-                last_page=page_num + 1
+        # PDFs split in the same second must not share page file names
+        unique_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        # Uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are already spooled to disk, so hand
+        # poppler that file instead of reading the whole PDF into memory first
+        if hasattr(pdf_file, 'temporary_file_path'):
+            convert, pdf_source = convert_from_path, pdf_file.temporary_file_path()
+        else:
+            pdf_file.seek(0)
+            convert, pdf_source = convert_from_bytes, pdf_file.read()
+
+        # Rasterise every page in a single poppler run, written straight to JPEG files,
+        # instead of counting pages with PyPDF2 and re-parsing the PDF for each page.
+        # The pages are the stored bill files, so they keep the full 200 dpi; analysis
+        # downscales its own copy to the OpenAI size budget.
+        with tempfile.TemporaryDirectory() as output_folder:
+            page_paths = convert(
+                pdf_source,
+                dpi=200,
+                fmt='jpeg',
+                output_folder=output_folder,
+                paths_only=True,
+                thread_count=PDF_RENDER_THREADS
             )
 
-            if page_images:
-                image_io = BytesIO()
-                page_images[0].save(image_io, format='JPEG')
-                image_io.seek(0)
-
-                # Create bill for this page with uploaded_by user
-                bill = VendorBill.objects.create(
-                    file=ContentFile(
-                        image_io.read(),
-                        name=f"BM-Vendor-Page-{page_num + 1}-{unique_id}.jpg"
-                    ),
+            for page_num, page_path in enumerate(page_paths):
+                # Store the page file now; the bill rows are inserted by the caller
+                bill = VendorBill(
                     fileType=file_type,
                     organization=organization,
                     uploaded_by=uploaded_by,
                     status='Draft'
                 )
+                # Stream the rendered page into storage instead of reading it into memory first
+                with open(page_path, 'rb') as page_image:
+                    bill.file_hash = VendorBill.compute_file_hash(page_image)
+                    bill.file.save(f"BM-Vendor-Page-{page_num + 1}-{unique_id}.jpg", File(page_image), save=False)
                 created_bills.append(bill)
 
     except Exception as e:
+        discard_stored_bill_files(created_bills)
         logger.error(f"Error splitting vendor PDF: {str(e)}")
         raise Exception(f"Vendor PDF processing failed: {str(e)}")
 
@@ -490,6 +763,15 @@ def process_pdf_splitting_vendor(pdf_file, organization, file_type, uploaded_by)
 # ============================================================================
 # ✅
 @extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='cursor',
+            description='Use keyset pagination: pass an empty value for the first page, then follow the next/previous links. The response has no count.',
+            required=False,
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY
+        )
+    ],
     responses=ZohoVendorBillSerializer(many=True),
     tags=["Zoho Vendor Bills"],
     methods=["GET"]
@@ -513,19 +795,23 @@ def vendor_bills_list_view(request, org_id):
     elif status_param == 'synced':
         bills = bills.filter(status='Synced')
 
-    bills = bills.order_by('-created_at')
-
-    # Apply pagination
-    paginator = DefaultPagination()
+    # The list serializer renders the uploader for every bill; join it so a page costs one query,
+    # and load only the columns it reads so analysed_data never leaves the database
+    bills = bills.select_related('uploaded_by').only(
+        'id', 'billmunshiName', 'file', 'fileType', 'status', 'process', 'created_at', 'update_at',
+        'uploaded_by__id', 'uploaded_by__username', 'uploaded_by__first_name',
+        'uploaded_by__last_name', 'uploaded_by__email'
+    ).order_by('-created_at')
+
+    # Apply pagination; clients that send ?cursor get keyset pages, which stay cheap at any depth
+    if 'cursor' in request.query_params:
+        paginator = CreatedAtCursorPagination()
+    else:
+        paginator = DefaultPagination()
+    # REST_FRAMEWORK["PAGE_SIZE"] is set, so both paginators always return a page
     paginated_bills = paginator.paginate_queryset(bills, request)
-
-    if paginated_bills is not None:
-        serializer = ZohoVendorBillSerializer(paginated_bills, many=True, context={'request': request})
-        return paginator.get_paginated_response(serializer.data)
-
-    # Fallback if pagination fails
-    serializer = ZohoVendorBillSerializer(bills, many=True)
-    return Response({"results": serializer.data})
+    serializer = ZohoVendorBillSerializer(paginated_bills, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
 
 
 # ✅
@@ -533,6 +819,15 @@ def vendor_bills_list_view(request, org_id):
     summary="Upload Vendor Bills",
     description="Upload single or multiple vendor bill files (PDF, JPG, PNG). Supports both single file and multiple file uploads with PDF splitting for multiple invoices.",
     request=ZohoVendorBillMultipleUploadSerializer,
+    parameters=[
+        OpenApiParameter(
+            name='analyze',
+            description='Queue every created bill (e.g. each page of a split PDF) for background analysis; the bills are analysed concurrently',
+            required=False,
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY
+        )
+    ],
     responses={201: ZohoVendorBillSerializer(many=True)},
     tags=['Zoho Vendor Bills']
 )
@@ -542,33 +837,10 @@ def vendor_bills_list_view(request, org_id):
 def vendor_bill_upload_view(request, org_id):
     """Handle single or multiple vendor bill file uploads with PDF splitting support"""
 
-    # Handle both single file and multiple files seamlessly
-    files_data = []
-
-    # Debug logging with prints (will show in gunicorn logs)
-    print(f"[VENDOR DEBUG] Request data keys: {list(request.data.keys())}")
-    print(f"[VENDOR DEBUG] 'files' in request.data: {'files' in request.data}")
-    print(f"[VENDOR DEBUG] 'file' in request.data: {'file' in request.data}")
-
-    # Check if files are provided as a list (multiple files)
-    if 'files' in request.data:
-        files_data = request.data.getlist('files') if hasattr(request.data, 'getlist') else request.data.get('files', [])
-        # Ensure files_data is always a list
-        if not isinstance(files_data, list):
-            files_data = [files_data] if files_data else []
-        print(f"[VENDOR DEBUG] Found 'files' field with {len(files_data)} file(s)")
-    # Check if a single file is provided
-    elif 'file' in request.data:
-        single_file = request.data.get('file')
-        if single_file:
-            files_data = [single_file]
-        print(f"[VENDOR DEBUG] Found 'file' field with {len(files_data)} file(s)")
-
-    print(f"[VENDOR DEBUG] Total files collected: {len(files_data)}")
-
-    # Debug: Print details about each file
-    for i, f in enumerate(files_data):
-        print(f"[VENDOR DEBUG] File {i+1}: {getattr(f, 'name', 'Unknown')} - Size: {getattr(f, 'size', 'Unknown')}")
+    # Uploaded files always live in request.FILES, whose getlist() returns a list
+    files_data = request.FILES.getlist('files') or (
+        [request.FILES['file']] if 'file' in request.FILES else []
+    )
 
     # Prepare data for serializer validation
     serializer_data = {
@@ -576,8 +848,6 @@ def vendor_bill_upload_view(request, org_id):
         'fileType': request.data.get('fileType', 'Single Invoice/File')
     }
 
-    print(f"[VENDOR DEBUG] Serializer data: files count = {len(serializer_data['files'])}, fileType = {serializer_data['fileType']}")
-
     serializer = ZohoVendorBillMultipleUploadSerializer(data=serializer_data)
     if not serializer.is_valid():
         return Response({
@@ -596,8 +866,9 @@ def vendor_bill_upload_view(request, org_id):
     files = serializer.validated_data['files']
     file_type = serializer.validated_data['fileType']
     created_bills = []
-
-    print(f"[VENDOR DEBUG] After serializer validation - files count: {len(files)}, fileType: {file_type}")
+    # Bills whose file is already in storage; removed again if their rows never get inserted
+    stored_bills = []
+    inserted = False
 
     if not files:
         return Response({
@@ -606,41 +877,60 @@ def vendor_bill_upload_view(request, org_id):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # Temporarily removing atomic transaction to debug
-        # with transaction.atomic():
-        print(f"[VENDOR DEBUG] Starting to process {len(files)} files")
-        for i, uploaded_file in enumerate(files):
-                print(f"[VENDOR DEBUG] Processing file {i+1}/{len(files)}: {uploaded_file.name}")
-                file_extension = uploaded_file.name.lower().split('.')[-1]
-
-                # Handle PDF splitting for multiple invoice files
-                if (file_type == 'Multiple Invoice/File' and
-                        file_extension == 'pdf'):
-
-                    print(f"[VENDOR DEBUG] Processing as PDF split for file: {uploaded_file.name}")
-                    pdf_bills = process_pdf_splitting_vendor(
-                        uploaded_file, organization, file_type, request.user
-                    )
-                    print(f"[VENDOR DEBUG] PDF splitting created {len(pdf_bills)} bills")
-                    created_bills.extend(pdf_bills)
-                else:
-                    # Create single bill (including PDFs for single invoice type)
-                    print(f"[VENDOR DEBUG] Creating single bill for file: {uploaded_file.name}")
-                    bill = VendorBill.objects.create(
-                        file=uploaded_file,
-                        fileType=file_type,
-                        organization=organization,
-                        uploaded_by=request.user,
-                        status='Draft'
-                    )
-                    print(f"[VENDOR DEBUG] Created bill: {bill.billmunshiName} (ID: {bill.id})")
-                    created_bills.append(bill)
-
-        print(f"[VENDOR DEBUG] Completed processing all files. Total bills created: {len(created_bills)}")
-
-        # Debug: Print all created bills
-        for i, bill in enumerate(created_bills):
-            print(f"[VENDOR DEBUG] Bill {i+1}: {bill.billmunshiName} (ID: {bill.id})")
+        # Handle PDF splitting for multiple invoice files
+        pdf_files = []
+        if file_type == 'Multiple Invoice/File':
+            pdf_files = [
+                uploaded_file for uploaded_file in files
+                if os.path.splitext(uploaded_file.name)[1].lower() == '.pdf'
+            ]
+        split_pages = {}
+        if pdf_files:
+            max_workers = min(_PDF_SPLIT_WORKERS, len(pdf_files))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                split_futures = [
+                    (pdf_file, executor.submit(split_vendor_pdf_pages, pdf_file, organization, file_type, request.user))
+                    for pdf_file in pdf_files
+                ]
+            # Track every successful split before re-raising a failed one, so its pages are cleaned up too
+            for pdf_file, future in split_futures:
+                if future.exception() is None:
+                    split_pages[id(pdf_file)] = future.result()
+                    stored_bills.extend(split_pages[id(pdf_file)])
+            for _, future in split_futures:
+                future.result()
+
+        for uploaded_file in files:
+            if id(uploaded_file) in split_pages:
+                created_bills.extend(split_pages[id(uploaded_file)])
+            else:
+                # Single bill (including PDFs for single invoice type); the rows are inserted together below
+                bill = VendorBill(
+                    file_hash=VendorBill.compute_file_hash(uploaded_file),
+                    fileType=file_type,
+                    organization=organization,
+                    uploaded_by=request.user,
+                    status='Draft'
+                )
+                bill.file.save(uploaded_file.name, uploaded_file, save=False)
+                stored_bills.append(bill)
+                created_bills.append(bill)
+
+        # Number and insert in one transaction: the organization row stays locked until the
+        # rows are in, so concurrent uploads cannot hand out the same names
+        with transaction.atomic():
+            names = VendorBill.generate_billmunshi_names(organization, len(created_bills))
+            for bill, name in zip(created_bills, names):
+                bill.billmunshiName = name
+            VendorBill.objects.bulk_create(created_bills, batch_size=BILL_BULK_CREATE_BATCH_SIZE)
+        inserted = True
+
+        logger.debug("vendor_bill_upload_view - created %s bills from %s files", len(created_bills), len(files))
+
+        # Pages of a split PDF are analysed side by side instead of one analyze call at a time
+        queued_count = 0
+        if request.query_params.get('analyze', '').lower() in ('1', 'true'):
+            queued_count = sum(queue_vendor_bill_analysis(bill.id) for bill in created_bills)
 
         response_serializer = ZohoVendorBillSerializer(created_bills, many=True, context={'request': request})
 
@@ -653,10 +943,13 @@ def vendor_bill_upload_view(request, org_id):
             'message': f'Successfully uploaded {len(files)} file(s) and created {len(created_bills)} bill(s)',
             'files_uploaded': len(files),
             'bills_created': len(created_bills),
+            'bills_queued_for_analysis': queued_count,
             'bills': response_serializer.data
         }, status=status.HTTP_201_CREATED)
 
     except Exception as e:
+        if not inserted:
+            discard_stored_bill_files(stored_bills)
         logger.error(f"Error uploading vendor bills: {str(e)}")
         logger.error(f"Exception type: {type(e).__name__}")
         import traceback
@@ -683,18 +976,31 @@ def vendor_bill_detail_view(request, org_id, bill_id):
         return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
 
     try:
-        # Fetch the VendorBill without prefetch_related to avoid relationship errors
-        bill = VendorBill.objects.get(id=bill_id, organization=organization)
+        # VendorZohoBill points at VendorBill through a plain FK, so join from the
+        # analysed side: one query returns both rows when the bill has been analysed.
+        # Product FKs serialize as primary keys, so only the products themselves
+        # need prefetching.
+        zoho_bill = VendorZohoBill.objects.select_related('selectBill').prefetch_related(
+            'products'
+        ).filter(
+            selectBill_id=bill_id,
+            selectBill__organization=organization,
+            organization=organization
+        ).first()
+
+        if zoho_bill:
+            bill = zoho_bill.selectBill
+        else:
+            bill = VendorBill.objects.get(id=bill_id, organization=organization)
 
-        # Get the next bill with 'Analysed' status
-        next_bill_id = None
-        analysed_bills = VendorBill.objects.filter(
+        # Get the next bill with 'Analysed' status; LIMIT 1 instead of loading every id
+        next_bill_id = VendorBill.objects.filter(
             organization=organization,
             status='Analysed'
-        ).exclude(id=bill_id).values_list('id', flat=True)
+        ).exclude(id=bill_id).order_by('created_at').values_list('id', flat=True).first()
 
-        if analysed_bills:
-            next_bill_id = str(analysed_bills[0])  # Get the first analysed bill
+        if next_bill_id:
+            next_bill_id = str(next_bill_id)  # Get the first analysed bill
             logger.info(f"Found next analysed bill: {next_bill_id}")
         else:
             logger.info("No analysed bills found for next_bill")
@@ -702,18 +1008,11 @@ def vendor_bill_detail_view(request, org_id, bill_id):
         # Always set next_bill on the bill object
         bill.next_bill = next_bill_id
 
-        # Get the related VendorZohoBill if it exists
-        try:
-            zoho_bill = VendorZohoBill.objects.select_related('vendor', 'tds_tcs_id').prefetch_related(
-                'products__chart_of_accounts',
-                'products__taxes'
-            ).get(selectBill=bill, organization=organization)
+        # Attach zoho_bill (or None) to the bill object for the serializer
+        bill.zoho_bill = zoho_bill
 
-            # Attach zoho_bill to the bill object for the serializer
-            bill.zoho_bill = zoho_bill
-        except VendorZohoBill.DoesNotExist:
-            # If no VendorZohoBill exists, set it to None
-            bill.zoho_bill = None
+        # A queued background analysis holds the bill's lock until it has been persisted
+        bill.analysis_in_progress = cache.get(_analysis_lock_key(bill.id)) is not None
 
         # Serialize the data with request context for full URLs
         serializer = ZohoVendorBillDetailSerializer(bill, context={'request': request})
@@ -725,14 +1024,26 @@ def vendor_bill_detail_view(request, org_id, bill_id):
 
 # ✅
 @extend_schema(
-    responses=AnalysisResponseSerializer,
+    parameters=[
+        OpenApiParameter(
+            name='background',
+            description='Analyze in the background and return 202 immediately; poll the bill details until analysis_in_progress is false',
+            required=False,
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY
+        )
+    ],
+    responses={200: AnalysisResponseSerializer, 202: AnalysisResponseSerializer},
     tags=["Zoho Vendor Bills"],
     methods=["POST"]
 )
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def vendor_bill_analyze_view(request, org_id, bill_id):
-    """Analyze vendor bill using OpenAI. Changes status from 'Draft' to 'Analyzed'."""
+    """
+    Analyze vendor bill using OpenAI. Changes status from 'Draft' to 'Analyzed'.
+    With ?background=true the analysis is queued and the request returns 202 right away.
+    """
     organization = get_organization_from_request(request, org_id=org_id)
     if not organization:
         return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -748,27 +1059,36 @@ def vendor_bill_analyze_view(request, org_id, bill_id):
                 'required_status': 'Draft'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Read file content
-        try:
-            bill.file.seek(0)
-            file_content = bill.file.read()
-            file_extension = bill.file.name.split('.')[-1].lower()
-        except Exception as e:
-            logger.error(f"Error reading bill file: {e}")
-            return Response({
-                'error': 'File Read Error',
-                'detail': 'Unable to read the bill file. The file may be corrupted or inaccessible.',
-                'message': str(e)
-            }, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('background', '').lower() in ('1', 'true'):
+            if queue_vendor_bill_analysis(bill.id):
+                detail = "Bill analysis started"
+            else:
+                detail = "Bill analysis already in progress"
+            return Response({"detail": detail, "bill_id": str(bill.id)}, status=status.HTTP_202_ACCEPTED)
 
-        # Analyze with OpenAI
-        analyzed_data = analyze_vendor_bill_with_openai(file_content, file_extension)
+        # An identical file already analysed in this organization needs no OpenAI call
+        analyzed_data = bill.prior_analysis()
+        if analyzed_data is None:
+            # Open the file here so unreadable files are reported; it is read during analysis
+            try:
+                bill_file = bill.file.open('rb')
+                file_extension = bill.file.name.split('.')[-1].lower()
+            except Exception as e:
+                logger.error(f"Error reading bill file: {e}")
+                return Response({
+                    'error': 'File Read Error',
+                    'detail': 'Unable to read the bill file. The file may be corrupted or inaccessible.',
+                    'message': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Analyze with OpenAI
+            analyzed_data = analyze_vendor_bill_with_openai(bill_file, file_extension)
 
         # Update bill with analyzed data
         bill.analysed_data = analyzed_data
         bill.status = 'Analysed'
         bill.process = True
-        bill.save()
+        bill.save(update_fields=["analysed_data", "status", "process", "update_at"])
 
         # Create Zoho bill and product objects from analysis
         create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization)
@@ -788,9 +1108,91 @@ def vendor_bill_analyze_view(request, org_id, bill_id):
         )
 
 
+@extend_schema(
+    request=ZohoVendorBillBulkAnalyzeSerializer,
+    responses=BulkAnalysisResponseSerializer,
+    tags=["Zoho Vendor Bills"],
+    methods=["POST"]
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def vendor_bills_bulk_analyze_view(request, org_id):
+    """Analyze several Draft vendor bills concurrently. Each analysed bill moves to 'Analysed'."""
+    organization = get_organization_from_request(request, org_id=org_id)
+    if not organization:
+        return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = ZohoVendorBillBulkAnalyzeSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    bill_ids = list(dict.fromkeys(serializer.validated_data['bill_ids']))
+
+    bills_by_id = {
+        bill.id: bill
+        for bill in VendorBill.objects.filter(id__in=bill_ids, organization=organization)
+    }
+
+    results = {}
+    pending = []
+    file_tuples = []
+    reused = []
+    for bill_id in bill_ids:
+        bill = bills_by_id.get(bill_id)
+        if bill is None:
+            results[bill_id] = {"bill_id": str(bill_id), "status": "error", "detail": "Vendor bill not found"}
+            continue
+        if bill.status != 'Draft':
+            results[bill_id] = {
+                "bill_id": str(bill_id),
+                "status": "error",
+                "detail": f'Bill must be in "Draft" status to analyze. Current status: {bill.status}'
+            }
+            continue
+
+        # An identical file already analysed in this organization needs no OpenAI call
+        prior_analysis = bill.prior_analysis()
+        if prior_analysis is not None:
+            reused.append((bill, prior_analysis))
+            continue
+
+        # Open files up front; each worker reads its own file so only in-flight uploads are in memory
+        try:
+            file_tuples.append((bill.file.open('rb'), bill.file.name.split('.')[-1].lower()))
+            pending.append(bill)
+        except Exception as e:
+            logger.error(f"Error reading bill file: {e}")
+            results[bill_id] = {"bill_id": str(bill_id), "status": "error", "detail": "Unable to read the bill file"}
+
+    for bill, analyzed_data in [*zip(pending, analyze_vendor_bills_parallel(file_tuples)), *reused]:
+        try:
+            with transaction.atomic():
+                bill.analysed_data = analyzed_data
+                bill.status = 'Analysed'
+                bill.process = True
+                bill.save(update_fields=["analysed_data", "status", "process", "update_at"])
+                create_vendor_zoho_objects_from_analysis(bill, analyzed_data, organization)
+            results[bill.id] = {"bill_id": str(bill.id), "status": "Analysed", "analyzed_data": analyzed_data}
+        except Exception as e:
+            logger.error(f"Analysis failed for vendor bill {bill.id}: {str(e)}")
+            results[bill.id] = {"bill_id": str(bill.id), "status": "error", "detail": f"Analysis failed: {str(e)}"}
+
+    return Response({
+        "detail": f"Analyzed {len(pending) + len(reused)} of {len(bill_ids)} bills",
+        "results": [results[bill_id] for bill_id in bill_ids]
+    })
+
+
 @extend_schema(
     request=VendorZohoBillSerializer,
-    responses=VendorZohoBillSerializer,
+    responses=VerifyResponseSerializer,
+    parameters=[
+        OpenApiParameter(
+            name='full',
+            description='Return the full serialized bill with its products instead of the verification summary',
+            required=False,
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY
+        )
+    ],
     tags=["Zoho Vendor Bills"],
     methods=["POST"]
 )
@@ -798,42 +1200,35 @@ def vendor_bill_analyze_view(request, org_id, bill_id):
 @permission_classes([IsAuthenticated])
 def vendor_bill_verify_view(request, org_id, bill_id):
     """Verify and update Zoho vendor data. Changes status from 'Analyzed' to 'Verified'."""
-    logger.error("="*80)
-    logger.error("[DEBUG] vendor_bill_verify_view - FUNCTION CALLED!")
-    logger.error(f"[DEBUG] vendor_bill_verify_view - Request method: {request.method}")
-    logger.error(f"[DEBUG] vendor_bill_verify_view - URL params - org_id: {org_id}, bill_id: {bill_id}")
+    logger.debug("vendor_bill_verify_view - URL params - org_id: %s, bill_id: %s", org_id, bill_id)
 
     organization = get_organization_from_request(request, org_id=org_id)
     if not organization:
-        logger.error(f"[DEBUG] vendor_bill_verify_view - ERROR: Organization not found for org_id: {org_id}")
+        logger.debug("vendor_bill_verify_view - ERROR: Organization not found for org_id: %s", org_id)
         return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
 
     try:
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Inside try block, processing request data")
-        logger.error(f"[DEBUG] vendor_bill_verify_view - request.data type: {type(request.data)}")
-        logger.error(f"[DEBUG] vendor_bill_verify_view - request.data content: {request.data}")
+        logger.debug("vendor_bill_verify_view - request.data content: %s", request.data)
 
         # Handle the new payload format - extract bill_id and zoho_bill data
         payload_bill_id = request.data.get('bill_id', bill_id)
         zoho_bill_data = request.data.get('zoho_bill', request.data)
 
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Starting verification for bill_id: {payload_bill_id}")
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Organization: {organization.name if organization else 'None'}")
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Received zoho_bill_data keys: {list(zoho_bill_data.keys()) if zoho_bill_data else 'None'}")
+        logger.debug("vendor_bill_verify_view - Starting verification for bill_id: %s", payload_bill_id)
+        logger.debug("vendor_bill_verify_view - Organization: %s", organization.name if organization else 'None')
 
         # Debug vendor data in the payload
         vendor_data = zoho_bill_data.get('vendor')
         if vendor_data:
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Vendor data in payload: {vendor_data}")
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Vendor data type: {type(vendor_data)}")
+            logger.debug("vendor_bill_verify_view - Vendor data in payload: %s", vendor_data)
 
             # Validate vendor exists before proceeding
             try:
                 from .models import ZohoVendor
                 vendor_obj = ZohoVendor.objects.get(id=vendor_data, organization=organization)
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Found vendor in database: {vendor_obj.companyName} (ID: {vendor_obj.id})")
+                logger.debug("vendor_bill_verify_view - Found vendor in database: %s (ID: %s)", vendor_obj.companyName, vendor_obj.id)
             except ZohoVendor.DoesNotExist:
-                logger.error(f"[DEBUG] vendor_bill_verify_view - ERROR: Vendor {vendor_data} does not exist in organization {organization.name}")
+                logger.debug("vendor_bill_verify_view - ERROR: Vendor %s does not exist in organization %s", vendor_data, organization.name)
                 return Response({
                     'error': 'Vendor Not Found',
                     'detail': f'Vendor with ID {vendor_data} does not exist in this organization. Please sync vendors from Zoho Books first.',
@@ -841,54 +1236,49 @@ def vendor_bill_verify_view(request, org_id, bill_id):
                     'solution': 'Sync vendors from Zoho Books or select a different vendor'
                 }, status=status.HTTP_400_BAD_REQUEST)
             except Exception as vendor_check_error:
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Error checking vendor: {vendor_check_error}")
+                logger.debug("vendor_bill_verify_view - Error checking vendor: %s", vendor_check_error)
         else:
-            logger.error(f"[DEBUG] vendor_bill_verify_view - No vendor data found in payload")
+            logger.debug("vendor_bill_verify_view - No vendor data found in payload")
 
-        # Use the bill_id from payload if provided, otherwise use URL parameter
-        bill = VendorBill.objects.get(id=payload_bill_id, organization=organization)
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Found VendorBill: {bill.id}, status: {bill.status}")
+        # Lock the bill for the whole verification so concurrent saves cannot interleave;
+        # everything below commits once
+        with transaction.atomic():
+            # Use the bill_id from payload if provided, otherwise use URL parameter
+            bill = VendorBill.objects.select_for_update().get(id=payload_bill_id, organization=organization)
+            logger.debug("vendor_bill_verify_view - Found VendorBill: %s, status: %s", bill.id, bill.status)
 
-        if bill.status not in ['Analysed', 'Verified']:
-            return Response({
-                'error': 'Invalid Bill Status',
-                'detail': f'Bill must be in "Analysed" or "Verified" status to save. Current status: {bill.status}',
-                'current_status': bill.status,
-                'required_status': ['Analysed', 'Verified']
-            }, status=status.HTTP_400_BAD_REQUEST)
+            if bill.status not in ['Analysed', 'Verified']:
+                return Response({
+                    'error': 'Invalid Bill Status',
+                    'detail': f'Bill must be in "Analysed" or "Verified" status to save. Current status: {bill.status}',
+                    'current_status': bill.status,
+                    'required_status': ['Analysed', 'Verified']
+                }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get existing VendorZohoBill
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Attempting to find VendorZohoBill for bill: {bill.id}, org: {organization.id}")
-        try:
-            zoho_bill = VendorZohoBill.objects.get(selectBill=bill, organization=organization)
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Found existing VendorZohoBill: {zoho_bill.id}")
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Current vendor in zoho_bill: {zoho_bill.vendor}")
-            if zoho_bill.vendor:
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Current vendor details: ID={zoho_bill.vendor.id}, Name={zoho_bill.vendor.companyName}, ContactID={zoho_bill.vendor.contactId}")
-            else:
-                logger.error(f"[DEBUG] vendor_bill_verify_view - No vendor currently assigned to zoho_bill")
-        except VendorZohoBill.DoesNotExist:
-            logger.error(f"[DEBUG] vendor_bill_verify_view - VendorZohoBill not found for bill {bill.id}")
-            return Response({
-                'error': 'Analysis Data Not Found',
-                'detail': 'No analyzed vendor data found for this bill. Please analyze the bill first before verification.',
-                'bill_id': str(bill.id),
-                'solution': 'Use the analyze endpoint to process the bill first'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as zoho_bill_error:
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Unexpected error getting VendorZohoBill: {zoho_bill_error}")
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Error type: {type(zoho_bill_error).__name__}")
-            import traceback
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Traceback: {traceback.format_exc()}")
-            return Response(
-                {"detail": f"Error retrieving vendor data: {str(zoho_bill_error)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            # Get existing VendorZohoBill
+            logger.debug("vendor_bill_verify_view - Attempting to find VendorZohoBill for bill: %s, org: %s", bill.id, organization.id)
+            try:
+                zoho_bill = VendorZohoBill.objects.select_for_update().get(selectBill=bill, organization=organization)
+                logger.debug("vendor_bill_verify_view - Found existing VendorZohoBill: %s", zoho_bill.id)
+                logger.debug("vendor_bill_verify_view - Current vendor in zoho_bill: %s", zoho_bill.vendor_id)
+            except VendorZohoBill.DoesNotExist:
+                logger.debug("vendor_bill_verify_view - VendorZohoBill not found for bill %s", bill.id)
+                return Response({
+                    'error': 'Analysis Data Not Found',
+                    'detail': 'No analyzed vendor data found for this bill. Please analyze the bill first before verification.',
+                    'bill_id': str(bill.id),
+                    'solution': 'Use the analyze endpoint to process the bill first'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            except Exception as zoho_bill_error:
+                logger.exception("vendor_bill_verify_view - Unexpected error getting VendorZohoBill: %s", zoho_bill_error)
+                return Response(
+                    {"detail": f"Error retrieving vendor data: {str(zoho_bill_error)}"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
 
-        with transaction.atomic():
             # Use partial=True for POST as we're updating existing data
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Creating serializer with partial=True")
-            logger.error(f"[DEBUG] vendor_bill_verify_view - Serializer data being passed: {zoho_bill_data}")
+            logger.debug("vendor_bill_verify_view - Creating serializer with partial=True")
+            logger.debug("vendor_bill_verify_view - Serializer data being passed: %s", zoho_bill_data)
 
             # Pass organization in context for proper vendor queryset scoping
             serializer = VendorZohoBillSerializer(
@@ -899,29 +1289,26 @@ def vendor_bill_verify_view(request, org_id, bill_id):
             )
 
             if serializer.is_valid():
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Serializer is valid, proceeding to save")
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Validated data keys: {list(serializer.validated_data.keys())}")
+                logger.debug("vendor_bill_verify_view - Serializer is valid, proceeding to save")
 
                 # Log critical fields before save
                 vendor_in_validated = serializer.validated_data.get('vendor')
                 if vendor_in_validated:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Vendor in validated_data: {vendor_in_validated.companyName} (ID: {vendor_in_validated.id})")
+                    logger.debug("vendor_bill_verify_view - Vendor in validated_data: %s (ID: %s)", vendor_in_validated.companyName, vendor_in_validated.id)
                 else:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - No vendor in validated_data")
+                    logger.debug("vendor_bill_verify_view - No vendor in validated_data")
 
                 # Log other critical fields
                 for field in ['bill_no', 'bill_date', 'due_date', 'total', 'discount_amount', 'adjustment_amount']:
                     if field in serializer.validated_data:
-                        logger.error(f"[DEBUG] vendor_bill_verify_view - {field}: {serializer.validated_data[field]}")
+                        logger.debug("vendor_bill_verify_view - %s: %s", field, serializer.validated_data[field])
 
                 # Save the bill data
                 try:
                     updated_bill = serializer.save()
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Bill saved successfully: ID={updated_bill.id}")
+                    logger.debug("vendor_bill_verify_view - Bill saved successfully: ID=%s", updated_bill.id)
                 except Exception as save_error:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - ERROR saving bill: {save_error}")
-                    import traceback
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Save traceback: {traceback.format_exc()}")
+                    logger.exception("vendor_bill_verify_view - ERROR saving bill: %s", save_error)
                     return Response({
                         'error': 'Bill Save Failed',
                         'detail': f'Failed to save bill data: {str(save_error)}',
@@ -929,48 +1316,55 @@ def vendor_bill_verify_view(request, org_id, bill_id):
                     }, status=status.HTTP_400_BAD_REQUEST)
 
                 # Verify critical fields were saved correctly
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Verifying saved data:")
-                logger.error(f"  - Vendor: {updated_bill.vendor.companyName if updated_bill.vendor else 'NOT SET'}")
-                logger.error(f"  - Bill No: {updated_bill.bill_no}")
-                logger.error(f"  - Bill Date: {updated_bill.bill_date}")
-                logger.error(f"  - Due Date: {updated_bill.due_date}")
-                logger.error(f"  - Total: {updated_bill.total}")
-                logger.error(f"  - Discount: {updated_bill.discount_amount} ({updated_bill.discount_type})")
-                logger.error(f"  - Adjustment: {updated_bill.adjustment_amount}")
+                logger.debug("vendor_bill_verify_view - Verifying saved data:")
+                logger.debug("  - Vendor: %s", updated_bill.vendor_id or 'NOT SET')
+                logger.debug("  - Bill No: %s", updated_bill.bill_no)
+                logger.debug("  - Bill Date: %s", updated_bill.bill_date)
+                logger.debug("  - Due Date: %s", updated_bill.due_date)
+                logger.debug("  - Total: %s", updated_bill.total)
+                logger.debug("  - Discount: %s (%s)", updated_bill.discount_amount, updated_bill.discount_type)
+                logger.debug("  - Adjustment: %s", updated_bill.adjustment_amount)
 
                 # Warn if critical fields are missing
                 if not updated_bill.vendor:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - WARNING: Vendor not saved! Check if vendor ID was in request.")
+                    logger.debug("vendor_bill_verify_view - WARNING: Vendor not saved! Check if vendor ID was in request.")
                 if not updated_bill.bill_no:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - WARNING: Bill number not saved!")
+                    logger.debug("vendor_bill_verify_view - WARNING: Bill number not saved!")
 
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Complete updated bill: {updated_bill}")
+                logger.debug("vendor_bill_verify_view - Complete updated bill: %s", updated_bill)
                 
                 # Handle products update if provided
                 products_data = zoho_bill_data.get('products')
                 if products_data is not None:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Processing {len(products_data)} products from request")
+                    logger.debug("vendor_bill_verify_view - Processing %s products from request", len(products_data))
                     
                     # Get all existing products for this bill
-                    existing_products = {str(product.id): product for product in updated_bill.products.all()}
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Found {len(existing_products)} existing products in database")
+                    existing_products = updated_bill.products.in_bulk()
+                    logger.debug("vendor_bill_verify_view - Found %s existing products in database", len(existing_products))
 
                     # Track which products were processed (to keep)
                     processed_product_ids = set()
-                    created_count = 0
-                    updated_count = 0
+                    products_to_update = []
+                    products_to_create = []
+                    update_fields = set()
 
                     # Process each product from the request
                     for idx, product_data in enumerate(products_data):
-                        logger.error(f"[DEBUG] vendor_bill_verify_view - Processing product {idx + 1}: {product_data}")
+                        logger.debug("vendor_bill_verify_view - Processing product %s: %s", idx + 1, product_data)
                         
                         # Validate that item_details is present (required field)
                         if not product_data.get('item_details'):
-                            logger.warning(f"[DEBUG] vendor_bill_verify_view - Skipping product {idx + 1}: missing item_details")
+                            logger.debug("vendor_bill_verify_view - Skipping product %s: missing item_details", idx + 1)
                             continue
 
                         product_id = product_data.get('id')
-                        logger.error(f"[DEBUG] vendor_bill_verify_view - Product ID from request: {product_id}")
+                        logger.debug("vendor_bill_verify_view - Product ID from request: %s", product_id)
+                        # Normalise once so lookups use the same UUID keys in_bulk returns
+                        if isinstance(product_id, str):
+                            try:
+                                product_id = uuid.UUID(product_id)
+                            except ValueError:
+                                product_id = None
 
                         # Prepare product data for creation/update
                         product_fields = {
@@ -987,62 +1381,59 @@ def vendor_bill_verify_view(request, org_id, bill_id):
 
                         # Remove None values to avoid overwriting with null
                         product_fields = {k: v for k, v in product_fields.items() if v is not None}
-                        logger.error(f"[DEBUG] vendor_bill_verify_view - Product fields to save: {product_fields}")
+                        logger.debug("vendor_bill_verify_view - Product fields to save: %s", product_fields)
 
                         # Check if this is an existing product (has valid ID in database)
-                        if product_id and str(product_id) in existing_products:
+                        if product_id in existing_products:
                             # UPDATE existing product
-                            existing_product = existing_products[str(product_id)]
-                            logger.error(f"[DEBUG] vendor_bill_verify_view - Updating existing product: {product_id}")
+                            existing_product = existing_products[product_id]
+                            logger.debug("vendor_bill_verify_view - Updating existing product: %s", product_id)
                             
                             # Update each field
                             for field, value in product_fields.items():
                                 setattr(existing_product, field, value)
-                            
-                            existing_product.save()
-                            processed_product_ids.add(str(product_id))
-                            updated_count += 1
-                            logger.error(f"[DEBUG] vendor_bill_verify_view - Successfully updated product {product_id}")
+
+                            products_to_update.append(existing_product)
+                            update_fields.update(product_fields)
+                            processed_product_ids.add(product_id)
                         else:
                             # CREATE new product (either no ID provided or ID doesn't exist)
-                            logger.error(f"[DEBUG] vendor_bill_verify_view - Creating new product (ID: {product_id})")
-                            
-                            try:
-                                new_product = VendorZohoProduct.objects.create(
-                                    zohoBill=updated_bill,
-                                    organization=organization,
-                                    **product_fields
-                                )
-                                processed_product_ids.add(str(new_product.id))
-                                created_count += 1
-                                logger.error(f"[DEBUG] vendor_bill_verify_view - Successfully created new product with ID: {new_product.id}")
-                            except Exception as create_error:
-                                logger.error(f"[DEBUG] vendor_bill_verify_view - Error creating product: {create_error}")
-                                # Continue processing other products even if one fails
-                                continue
+                            logger.debug("vendor_bill_verify_view - Creating new product (ID: %s)", product_id)
+                            products_to_create.append(VendorZohoProduct(
+                                zohoBill=updated_bill,
+                                organization=organization,
+                                **product_fields
+                            ))
+
+                    # Write all changed and new rows in one statement each instead of one per product
+                    if products_to_update and update_fields:
+                        VendorZohoProduct.objects.bulk_update(products_to_update, sorted(update_fields), batch_size=500)
+                    if products_to_create:
+                        VendorZohoProduct.objects.bulk_create(products_to_create, batch_size=500)
+                    processed_product_ids.update(product.id for product in products_to_create)
+                    created_count = len(products_to_create)
+                    updated_count = len(products_to_update)
 
                     # DELETE products that were NOT in the request (removed by user)
-                    products_to_delete = set(existing_products.keys()) - processed_product_ids
+                    products_to_delete = existing_products.keys() - processed_product_ids
                     deleted_count = len(products_to_delete)
                     
                     if products_to_delete:
-                        logger.error(f"[DEBUG] vendor_bill_verify_view - Deleting {deleted_count} products not in request: {products_to_delete}")
-                        deleted = VendorZohoProduct.objects.filter(
-                            id__in=products_to_delete,
-                            zohoBill=updated_bill
-                        ).delete()
-                        logger.error(f"[DEBUG] vendor_bill_verify_view - Deleted {deleted[0]} product records")
+                        logger.debug("vendor_bill_verify_view - Deleting %s products not in request: %s", deleted_count, products_to_delete)
+                        # The ids came from this bill's own products, so no extra bill filter is needed
+                        deleted = VendorZohoProduct.objects.filter(id__in=products_to_delete).delete()
+                        logger.debug("vendor_bill_verify_view - Deleted %s product records", deleted[0])
                     else:
-                        logger.error(f"[DEBUG] vendor_bill_verify_view - No products to delete")
+                        logger.debug("vendor_bill_verify_view - No products to delete")
                     
                     # Log summary
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Product processing summary:")
-                    logger.error(f"  - Created: {created_count}")
-                    logger.error(f"  - Updated: {updated_count}")
-                    logger.error(f"  - Deleted: {deleted_count}")
-                    logger.error(f"  - Total processed: {len(processed_product_ids)}")
+                    logger.debug("vendor_bill_verify_view - Product processing summary:")
+                    logger.debug("  - Created: %s", created_count)
+                    logger.debug("  - Updated: %s", updated_count)
+                    logger.debug("  - Deleted: %s", deleted_count)
+                    logger.debug("  - Total processed: %s", len(processed_product_ids))
                 else:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - No products data in request, skipping product update")
+                    logger.debug("vendor_bill_verify_view - No products data in request, skipping product update")
 
                 # Validate bill has required data before marking as Verified
                 validation_errors = []
@@ -1059,7 +1450,7 @@ def vendor_bill_verify_view(request, org_id, bill_id):
                     validation_errors.append("At least one product line item is required")
                 
                 if validation_errors:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Validation failed: {validation_errors}")
+                    logger.debug("vendor_bill_verify_view - Validation failed: %s", validation_errors)
                     return Response({
                         'error': 'Validation Failed',
                         'detail': 'Bill cannot be verified due to missing required information',
@@ -1068,37 +1459,45 @@ def vendor_bill_verify_view(request, org_id, bill_id):
                     }, status=status.HTTP_400_BAD_REQUEST)
 
                 # Update bill status to Verified
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Updating bill status from '{bill.status}' to 'Verified'")
+                logger.debug("vendor_bill_verify_view - Updating bill status from '%s' to 'Verified'", bill.status)
                 bill.status = 'Verified'
-                bill.save()
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Bill status updated successfully to '{bill.status}'")
+                bill.save(update_fields=["status", "update_at"])
+                logger.debug("vendor_bill_verify_view - Bill status updated successfully to '%s'", bill.status)
 
-                # Refresh the bill to get latest data with relationships
-                updated_bill.refresh_from_db()
-                
-                # Prepare response with full bill data
-                response_data = VendorZohoBillSerializer(
-                    updated_bill, 
-                    context={'organization': organization, 'request': request}
-                ).data
-                
                 # Log final verification summary
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Verification completed successfully")
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Final summary:")
-                logger.error(f"  - Vendor: {response_data.get('vendor')}")
-                logger.error(f"  - Products count: {len(response_data.get('products', []))}")
-                logger.error(f"  - Bill total: {response_data.get('total')}")
-                logger.error(f"  - Status: Verified")
-
-                return Response(response_data)
+                logger.debug("vendor_bill_verify_view - Verification completed successfully")
+                logger.debug("vendor_bill_verify_view - Final summary:")
+                logger.debug("  - Vendor: %s", updated_bill.vendor_id)
+                logger.debug("  - Products count: %s", product_count)
+                logger.debug("  - Bill total: %s", updated_bill.total)
+                logger.debug("  - Status: Verified")
+
+                if request.query_params.get('full', '').lower() in ('1', 'true'):
+                    # Reload once with the products prefetched; the serializer walks
+                    # instance.products twice and FKs serialize as primary keys
+                    updated_bill = VendorZohoBill.objects.select_related('organization').prefetch_related(
+                        'products'
+                    ).get(pk=updated_bill.pk)
+                    return Response(VendorZohoBillSerializer(
+                        updated_bill,
+                        context={'organization': organization, 'request': request}
+                    ).data)
+
+                # The client already holds the data it posted, so only confirm the outcome
+                return Response({
+                    'id': str(updated_bill.id),
+                    'bill_id': str(bill.id),
+                    'status': bill.status,
+                    'products_count': product_count
+                })
 
             else:
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Serializer validation FAILED")
-                logger.error(f"[DEBUG] vendor_bill_verify_view - Serializer errors: {serializer.errors}")
+                logger.debug("vendor_bill_verify_view - Serializer validation FAILED")
+                logger.debug("vendor_bill_verify_view - Serializer errors: %s", serializer.errors)
 
                 # Check if vendor-related errors exist and provide helpful message
                 if 'vendor' in serializer.errors:
-                    logger.error(f"[DEBUG] vendor_bill_verify_view - Vendor-specific errors: {serializer.errors['vendor']}")
+                    logger.debug("vendor_bill_verify_view - Vendor-specific errors: %s", serializer.errors['vendor'])
                     vendor_error_detail = serializer.errors['vendor'][0] if serializer.errors['vendor'] else 'Unknown vendor error'
 
                     # Check if it's a "does not exist" error
@@ -1114,13 +1513,10 @@ def vendor_bill_verify_view(request, org_id, bill_id):
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     except VendorBill.DoesNotExist:
-        logger.error(f"[DEBUG] vendor_bill_verify_view - ERROR: VendorBill not found with ID: {payload_bill_id}, org: {organization.id if organization else 'None'}")
+        logger.debug("vendor_bill_verify_view - ERROR: VendorBill not found with ID: %s, org: %s", payload_bill_id, organization.id if organization else 'None')
         return Response({"detail": "Vendor bill not found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        logger.error(f"[DEBUG] vendor_bill_verify_view - UNEXPECTED ERROR: {str(e)}")
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Error type: {type(e).__name__}")
-        import traceback
-        logger.error(f"[DEBUG] vendor_bill_verify_view - Traceback: {traceback.format_exc()}")
+        logger.exception("vendor_bill_verify_view - UNEXPECTED ERROR: %s", e)
         raise
 
 
@@ -1150,7 +1546,9 @@ def vendor_bill_sync_view(request, org_id, bill_id):
 
         # Get Zoho vendor data
         try:
-            zoho_bill = VendorZohoBill.objects.get(selectBill=bill, organization=organization)
+            zoho_bill = VendorZohoBill.objects.select_related(
+                'vendor', 'discount_account', 'tds_tcs_id'
+            ).get(selectBill=bill, organization=organization)
         except VendorZohoBill.DoesNotExist:
             return Response({
                 'error': 'Zoho Data Not Found',
@@ -1161,7 +1559,7 @@ def vendor_bill_sync_view(request, org_id, bill_id):
 
         # Get Zoho credentials
         try:
-            current_token = ZohoCredentials.objects.get(organization=organization)
+            current_token = ZohoCredentials.for_organization(organization)
         except ZohoCredentials.DoesNotExist:
             return Response({
                 'error': 'Zoho Credentials Not Found',
@@ -1169,9 +1567,13 @@ def vendor_bill_sync_view(request, org_id, bill_id):
                 'solution': 'Add Zoho Books credentials in the organization settings'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get products
-        zoho_products = zoho_bill.products.all()
-        if not zoho_products.exists():
+        # Get products, joining the account and tax each line item needs in the same query.
+        # Materialised once so the emptiness check does not cost a separate EXISTS query.
+        zoho_products = list(zoho_bill.products.select_related('chart_of_accounts', 'taxes').only(
+            'id', 'rate', 'quantity', 'itc_eligibility', 'reverse_charge_tax_id',
+            'chart_of_accounts', 'chart_of_accounts__accountId', 'taxes', 'taxes__taxId'
+        ))
+        if not zoho_products:
             return Response({
                 'error': 'No Products Found',
                 'detail': 'No line items found for this bill. At least one product line item is required to sync.',
@@ -1251,11 +1653,11 @@ def vendor_bill_sync_view(request, org_id, bill_id):
                     "rate": float(item.rate) if item.rate else 0,
                     "quantity": float(item.quantity) if item.quantity else 1,
                     "discount": 0.00,
-                    "itc_eligibility": getattr(item, 'itc_eligibility', 'eligible')
+                    "itc_eligibility": item.itc_eligibility
                 }
 
                 # Add tax information
-                if hasattr(item, 'reverse_charge_tax_id') and item.reverse_charge_tax_id and item.taxes:
+                if item.reverse_charge_tax_id and item.taxes:
                     line_item['reverse_charge_tax_id'] = item.taxes.taxId
                 elif item.taxes:
                     line_item['tax_id'] = item.taxes.taxId
@@ -1276,35 +1678,36 @@ def vendor_bill_sync_view(request, org_id, bill_id):
 
         # Sync to Zoho Books
         url = f"https://www.zohoapis.in/books/v3/bills?organization_id={current_token.organisationId}"
-        payload = json.dumps(bill_data)
+        # Compact separators: the body is only read by Zoho, so skip the padding whitespace
+        payload = json.dumps(bill_data, separators=(',', ':'))
+        access_token = get_zoho_access_token(current_token)
         headers = {
-            'Authorization': f'Zoho-oauthtoken {current_token.accessToken}',
+            'Authorization': f'Zoho-oauthtoken {access_token}',
             'Content-Type': 'application/json'
         }
 
         try:
-            response = requests.post(url, headers=headers, data=payload)
+            response = ZOHO_API_SESSION.post(url, headers=headers, data=payload, timeout=ZOHO_API_TIMEOUT)
 
             # Handle token refresh if needed
             if response.status_code == 401:
-                new_access_token = refresh_zoho_access_token(current_token)
+                new_access_token = refresh_zoho_access_token(current_token, failed_token=access_token)
                 if new_access_token:
                     headers['Authorization'] = f'Zoho-oauthtoken {new_access_token}'
-                    response = requests.post(url, headers=headers, data=payload)
+                    response = ZOHO_API_SESSION.post(url, headers=headers, data=payload, timeout=ZOHO_API_TIMEOUT)
 
+            response_data = zoho_response_body(response)
             if response.status_code == 201:
                 # Update bill status
                 bill.status = 'Synced'
-                bill.save()
+                bill.save(update_fields=["status", "update_at"])
 
-                response_data = response.json()
                 return Response({
                     "detail": "Bill synced to Zoho successfully",
                     "zoho_bill_id": response_data.get('bill', {}).get('bill_id')
                 })
             else:
-                response_json = response.json() if response.content else {}
-                error_message = response_json.get("message", "Failed to send data to Zoho Books")
+                error_message = response_data.get("message", "Failed to send data to Zoho Books")
                 logger.error(f"Zoho sync failed: {response.status_code} - {error_message}")
                 return Response({
                     'error': 'Zoho Sync Failed',
@@ -1347,17 +1750,10 @@ def vendor_bill_delete_view(request, org_id, bill_id):
     try:
         bill = VendorBill.objects.get(id=bill_id, organization=organization)
 
-        # Delete the file from storage if it exists
-        if bill.file:
-            try:
-                file_path = os.path.join(settings.MEDIA_ROOT, str(bill.file))
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as e:
-                logger.warning(f"Could not delete file {bill.file}: {str(e)}")
-
-        # Delete the bill record from the database
-        bill.delete()
+        # Delete the bill record, then its file once the delete has committed
+        with transaction.atomic():
+            bill.delete()
+            delete_bill_file_on_commit(bill.file)
 
         return Response({
             "detail": "Vendor bill and associated file deleted successfully"
@@ -2,8 +2,9 @@
 
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
 
-from django.shortcuts import get_object_or_404
+from django.db import connection, transaction
 from django.utils import timezone
 
 from rest_framework import status
@@ -12,7 +13,6 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema
 
-from apps.organizations.models import Organization
 from apps.common.pagination import DefaultPagination
 from .models import (
     ZohoCredentials,
@@ -28,38 +28,28 @@ from .serializers.settings import (
     ZohoTaxesSerializer,
     ZohoTdsTcsSerializer,
 )
+from .vendor_views import get_organization_from_request
+from .utils import (
+    ZOHO_API_SESSION,
+    ZOHO_API_TIMEOUT,
+    ZOHO_AUTH_SESSION,
+    ZOHO_TOKEN_URL,
+    raise_for_zoho_status,
+    zoho_response_body,
+)
 
 logger = logging.getLogger(__name__)
 
+# Zoho Books list endpoints return at most this many records per page
+_ZOHO_PAGE_SIZE = 200
+# Rows per INSERT/UPDATE statement when upserting synced settings
+_ZOHO_SYNC_BATCH_SIZE = 500
+
 
 # ============================================================================
 # Helper Functions
 # ============================================================================
 
-def get_organization_from_request(request, **kwargs):
-    """Get organization from URL org_id parameter, API key, or user membership."""
-    # First check for org_id in URL kwargs (organization-scoped endpoints)
-    org_id = kwargs.get('org_id')
-    if org_id:
-        return get_object_or_404(Organization, id=org_id)
-
-    # Check for API key authentication
-    if hasattr(request, 'auth') and request.auth:
-        from apps.organizations.models import OrganizationAPIKey
-        try:
-            org_api_key = OrganizationAPIKey.objects.get(api_key=request.auth)
-            return org_api_key.organization
-        except OrganizationAPIKey.DoesNotExist:
-            pass
-
-    # Fallback to user membership
-    if hasattr(request.user, 'memberships'):
-        membership = request.user.memberships.filter(is_active=True).first()
-        if membership:
-            return membership.organization
-    return None
-
-
 def get_zoho_credentials(organization):
     """Get valid Zoho credentials for organization."""
     try:
@@ -72,8 +62,8 @@ def get_zoho_credentials(organization):
         raise ValueError("Zoho credentials not found for organization")
 
 
-def make_zoho_api_request(credentials, endpoint, method='GET', data=None):
-    """Make authenticated request to Zoho API."""
+def make_zoho_api_request(credentials, endpoint, method='GET', data=None, params=None):
+    """Make authenticated request to Zoho API; params are added to the query string."""
     headers = {
         'Authorization': f'Zoho-oauthtoken {credentials.accessToken}',
         'Content-Type': 'application/json'
@@ -86,20 +76,39 @@ def make_zoho_api_request(credentials, endpoint, method='GET', data=None):
         url = f"https://www.zohoapis.in/books/v3/{endpoint}?organization_id={credentials.organisationId}"
 
     try:
+        # Reuse the pooled keep-alive connections to zohoapis.in instead of a new handshake per call
         if method == 'GET':
-            response = requests.get(url, headers=headers)
+            response = ZOHO_API_SESSION.get(url, headers=headers, params=params, timeout=ZOHO_API_TIMEOUT)
         elif method == 'POST':
-            response = requests.post(url, headers=headers, json=data)
+            response = ZOHO_API_SESSION.post(url, headers=headers, params=params, json=data, timeout=ZOHO_API_TIMEOUT)
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
 
-        response.raise_for_status()
-        return response.json()
+        # Decode the body once; on failure it carries Zoho's message into the raised error
+        body = zoho_response_body(response)
+        raise_for_zoho_status(response, body)
+        return body
     except requests.RequestException as e:
         logger.error(f"Zoho API request failed: {str(e)}")
         raise
 
 
+def iter_zoho_pages(credentials, endpoint, key):
+    """
+    Yield the `key` records of each page of a Zoho list endpoint.
+    Follows page_context.has_more_page, so lists longer than one page are not cut off.
+    """
+    page = 1
+    while True:
+        zoho_data = make_zoho_api_request(
+            credentials, endpoint, params={'page': page, 'per_page': _ZOHO_PAGE_SIZE}
+        )
+        yield zoho_data.get(key, [])
+        if not zoho_data.get('page_context', {}).get('has_more_page'):
+            return
+        page += 1
+
+
 # ============================================================================
 # Zoho Settings/Credentials Management
 # ============================================================================
@@ -177,8 +186,6 @@ def generate_token_view(request, org_id):
         )
 
     # Prepare token generation request
-    token_url = "https://accounts.zoho.in/oauth/v2/token"
-
     token_data = {
         'code': credentials.accessCode,
         'client_id': credentials.clientId,
@@ -189,7 +196,7 @@ def generate_token_view(request, org_id):
 
     try:
         # Make request to Zoho OAuth API
-        response = requests.post(token_url, data=token_data, timeout=30)
+        response = ZOHO_AUTH_SESSION.post(ZOHO_TOKEN_URL, data=token_data, timeout=30)
 
         if response.status_code == 200:
             token_response = response.json()
@@ -235,6 +242,192 @@ def generate_token_view(request, org_id):
         )
 
 
+# ============================================================================
+# Zoho Settings Sync Helpers
+# ============================================================================
+
+def sync_zoho_vendors(organization, credentials):
+    """Upsert the organization's Zoho vendors; returns the number of new vendors."""
+    synced_count = 0
+    for contacts in iter_zoho_pages(credentials, "contacts", "contacts"):
+        vendor_contacts = {
+            contact['contact_id']: contact
+            for contact in contacts if contact.get('contact_type') == 'vendor'
+        }
+        if not vendor_contacts:
+            continue
+
+        # One lookup, one bulk update and one bulk insert per page instead of two queries per contact
+        existing_vendors = ZohoVendor.objects.filter(
+            organization=organization, contactId__in=vendor_contacts
+        ).in_bulk(field_name='contactId')
+        vendors_to_update = []
+        vendors_to_create = []
+        for contact_id, contact in vendor_contacts.items():
+            values = (
+                contact.get('company_name', ''),
+                contact.get('gst_no', ''),
+                contact.get('gst_treatment', ''),
+            )
+            vendor = existing_vendors.get(contact_id)
+            if vendor is None:
+                vendor = ZohoVendor(organization=organization, contactId=contact_id)
+                vendors_to_create.append(vendor)
+            elif (vendor.companyName, vendor.gstNo, vendor.gst_treatment) == values:
+                # Unchanged vendors are left out of the UPDATE entirely
+                continue
+            else:
+                vendors_to_update.append(vendor)
+            vendor.companyName, vendor.gstNo, vendor.gst_treatment = values
+            # Bulk writes bypass ZohoVendor.save(), which normally fills this in
+            vendor.companyName_lower = (vendor.companyName or '').strip().lower()
+
+        with transaction.atomic():
+            ZohoVendor.objects.bulk_update(
+                vendors_to_update,
+                ['companyName', 'companyName_lower', 'gstNo', 'gst_treatment'],
+                batch_size=_ZOHO_SYNC_BATCH_SIZE,
+            )
+            ZohoVendor.objects.bulk_create(vendors_to_create, batch_size=_ZOHO_SYNC_BATCH_SIZE)
+        synced_count += len(vendors_to_create)
+
+    # No post_save signals are sent for bulk writes
+    ZohoVendor.invalidate_lookups(organization.pk)
+
+    return synced_count
+
+
+def sync_zoho_chart_of_accounts(organization, credentials):
+    """Upsert the organization's Zoho chart of accounts; returns the number of new accounts."""
+    synced_count = 0
+    for zoho_accounts in iter_zoho_pages(credentials, "chartofaccounts", "chartofaccounts"):
+        account_names = {
+            account['account_id']: account.get('account_name', '') for account in zoho_accounts
+        }
+        if not account_names:
+            continue
+
+        # One lookup, one bulk update and one bulk insert per page instead of two queries per account
+        existing_accounts = ZohoChartOfAccount.objects.filter(
+            organization=organization, accountId__in=account_names
+        ).in_bulk(field_name='accountId')
+        accounts_to_update = []
+        accounts_to_create = []
+        for account_id, account_name in account_names.items():
+            chart_account = existing_accounts.get(account_id)
+            if chart_account is None:
+                accounts_to_create.append(ZohoChartOfAccount(
+                    organization=organization, accountId=account_id, accountName=account_name
+                ))
+            elif chart_account.accountName != account_name:
+                chart_account.accountName = account_name
+                accounts_to_update.append(chart_account)
+
+        with transaction.atomic():
+            ZohoChartOfAccount.objects.bulk_update(
+                accounts_to_update, ['accountName'], batch_size=_ZOHO_SYNC_BATCH_SIZE
+            )
+            ZohoChartOfAccount.objects.bulk_create(accounts_to_create, batch_size=_ZOHO_SYNC_BATCH_SIZE)
+        synced_count += len(accounts_to_create)
+
+    return synced_count
+
+
+def sync_zoho_taxes(organization, credentials):
+    """Add the organization's new Zoho taxes; returns how many were added."""
+    synced_count = 0
+    for zoho_taxes in iter_zoho_pages(credentials, "settings/taxes", "taxes"):
+        # Get existing tax IDs to avoid duplicates
+        existing_taxes = set(ZohoTaxes.objects.filter(
+            taxId__in=[tax["tax_id"] for tax in zoho_taxes],
+            organization=organization
+        ).values_list('taxId', flat=True))
+
+        # Create new taxes
+        new_taxes = []
+        for tax in zoho_taxes:
+            if tax["tax_id"] not in existing_taxes:
+                new_taxes.append(ZohoTaxes(
+                    taxId=tax["tax_id"],
+                    taxName=tax["tax_name"],
+                    organization=organization
+                ))
+
+        if new_taxes:
+            ZohoTaxes.objects.bulk_create(new_taxes, batch_size=_ZOHO_SYNC_BATCH_SIZE)
+            synced_count += len(new_taxes)
+
+    return synced_count
+
+
+def sync_zoho_tds_tcs(organization, credentials):
+    """Add the organization's new Zoho TDS and TCS taxes; returns (tds_count, tcs_count)."""
+    # Fetch TDS taxes
+    tds_data = make_zoho_api_request(credentials, "settings/taxes?is_tds_request=true")
+
+    tds_taxes = tds_data.get('taxes', [])
+
+    # Get existing TDS tax IDs to avoid duplicates
+    existing_tds_taxes = ZohoTdsTcs.objects.filter(
+        taxId__in=[tax["tax_id"] for tax in tds_taxes],
+        taxType="TDS",
+        organization=organization
+    ).values_list('taxId', flat=True)
+
+    # Create new TDS taxes
+    new_tds_taxes = []
+    for tax in tds_taxes:
+        if tax["tax_id"] not in existing_tds_taxes:
+            new_tds_taxes.append(ZohoTdsTcs(
+                taxId=tax["tax_id"],
+                taxName=tax["tax_name"],
+                taxPercentage=tax.get("tax_percentage", 0),
+                taxType="TDS",
+                organization=organization
+            ))
+
+    # Fetch TCS taxes
+    tcs_data = make_zoho_api_request(credentials, "settings/taxes?is_tcs_request=true&filter_by=Taxes.All")
+    tcs_taxes = tcs_data.get('taxes', [])
+
+    # Get existing TCS tax IDs to avoid duplicates
+    existing_tcs_taxes = ZohoTdsTcs.objects.filter(
+        taxId__in=[tax["tax_id"] for tax in tcs_taxes],
+        taxType="TCS",
+        organization=organization
+    ).values_list('taxId', flat=True)
+
+    # Create new TCS taxes
+    new_tcs_taxes = []
+    for tax in tcs_taxes:
+        if tax["tax_id"] not in existing_tcs_taxes:
+            new_tcs_taxes.append(ZohoTdsTcs(
+                taxId=tax["tax_id"],
+                taxName=tax["tax_name"],
+                taxPercentage=tax.get("tax_percentage", 0),
+                taxType="TCS",
+                organization=organization
+            ))
+
+    # Bulk create new taxes
+    if new_tds_taxes:
+        ZohoTdsTcs.objects.bulk_create(new_tds_taxes)
+
+    if new_tcs_taxes:
+        ZohoTdsTcs.objects.bulk_create(new_tcs_taxes)
+
+    return len(new_tds_taxes), len(new_tcs_taxes)
+
+
+# Settings synced together by zoho_full_sync_view, each on its own worker thread
+_ZOHO_FULL_SYNC = (
+    ("vendors", sync_zoho_vendors),
+    ("chart_of_accounts", sync_zoho_chart_of_accounts),
+    ("taxes", sync_zoho_taxes),
+    ("tds_tcs", lambda organization, credentials: sum(sync_zoho_tds_tcs(organization, credentials))),
+)
+
+
 # ============================================================================
 # Zoho Sync Endpoints (GET & SYNC only)
 # ============================================================================
@@ -252,7 +445,10 @@ def vendors_list_view(request, org_id):
     if not organization:
         return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    vendors = ZohoVendor.objects.filter(organization=organization).order_by('companyName')
+    # Only the serialized columns; OrgField renders the organization from organization_id alone
+    vendors = ZohoVendor.objects.filter(organization=organization).only(
+        'id', 'organization', 'contactId', 'companyName', 'gstNo', 'gst_treatment', 'created_at'
+    ).order_by('companyName')
 
     # Apply pagination
     paginator = DefaultPagination()
@@ -265,7 +461,7 @@ def vendors_list_view(request, org_id):
     # Fallback if pagination fails
     serializer = ZohoVendorSerializer(vendors, many=True)
     return Response({
-        "count": vendors.count(),
+        "count": len(serializer.data),
         "next": None,
         "previous": None,
         "results": serializer.data
@@ -287,22 +483,7 @@ def vendors_sync_view(request, org_id):
 
     try:
         credentials = get_zoho_credentials(organization)
-        zoho_data = make_zoho_api_request(credentials, "contacts")
-
-        synced_count = 0
-        for contact in zoho_data.get('contacts', []):
-            if contact.get('contact_type') == 'vendor':
-                vendor, created = ZohoVendor.objects.update_or_create(
-                    organization=organization,
-                    contactId=contact['contact_id'],
-                    defaults={
-                        'companyName': contact.get('company_name', ''),
-                        'gstNo': contact.get('gst_no', ''),
-                        'gst_treatment': contact.get('gst_treatment', '')
-                    }
-                )
-                if created:
-                    synced_count += 1
+        synced_count = sync_zoho_vendors(organization, credentials)
 
         return Response({
             "detail": f"Successfully synced {synced_count} vendors",
@@ -328,7 +509,9 @@ def chart_of_accounts_list_view(request, org_id):
     if not organization:
         return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    accounts = ZohoChartOfAccount.objects.filter(organization=organization).order_by('accountName')
+    accounts = ZohoChartOfAccount.objects.filter(organization=organization).only(
+        'id', 'organization', 'accountId', 'accountName', 'created_at'
+    ).order_by('accountName')
 
     # Apply pagination
     paginator = DefaultPagination()
@@ -358,19 +541,7 @@ def chart_of_accounts_sync_view(request, org_id):
 
     try:
         credentials = get_zoho_credentials(organization)
-        zoho_data = make_zoho_api_request(credentials, "chartofaccounts")
-
-        synced_count = 0
-        for account in zoho_data.get('chartofaccounts', []):
-            chart_account, created = ZohoChartOfAccount.objects.update_or_create(
-                organization=organization,
-                accountId=account['account_id'],
-                defaults={
-                    'accountName': account.get('account_name', '')
-                }
-            )
-            if created:
-                synced_count += 1
+        synced_count = sync_zoho_chart_of_accounts(organization, credentials)
 
         return Response({
             "detail": f"Successfully synced {synced_count} chart of accounts",
@@ -396,7 +567,9 @@ def taxes_list_view(request, org_id):
     if not organization:
         return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    taxes = ZohoTaxes.objects.filter(organization=organization).order_by('taxName')
+    taxes = ZohoTaxes.objects.filter(organization=organization).only(
+        'id', 'organization', 'taxId', 'taxName', 'created_at'
+    ).order_by('taxName')
 
     # Apply pagination
     paginator = DefaultPagination()
@@ -426,30 +599,7 @@ def taxes_sync_view(request, org_id):
 
     try:
         credentials = get_zoho_credentials(organization)
-        zoho_data = make_zoho_api_request(credentials, "settings/taxes")
-
-        zoho_taxes = zoho_data.get("taxes", [])
-
-        # Get existing tax IDs to avoid duplicates
-        existing_taxes = ZohoTaxes.objects.filter(
-            taxId__in=[tax["tax_id"] for tax in zoho_taxes],
-            organization=organization
-        ).values_list('taxId', flat=True)
-
-        # Create new taxes
-        new_taxes = []
-        for tax in zoho_taxes:
-            if tax["tax_id"] not in existing_taxes:
-                new_taxes.append(ZohoTaxes(
-                    taxId=tax["tax_id"],
-                    taxName=tax["tax_name"],
-                    organization=organization
-                ))
-
-        synced_count = 0
-        if new_taxes:
-            ZohoTaxes.objects.bulk_create(new_taxes)
-            synced_count = len(new_taxes)
+        synced_count = sync_zoho_taxes(organization, credentials)
 
         return Response({
             "detail": f"Successfully synced {synced_count} taxes",
@@ -486,7 +636,9 @@ def tds_tcs_list_view(request, org_id):
         return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
 
     # Start with base queryset
-    tds_tcs = ZohoTdsTcs.objects.filter(organization=organization)
+    tds_tcs = ZohoTdsTcs.objects.filter(organization=organization).only(
+        'id', 'organization', 'taxId', 'taxName', 'taxPercentage', 'taxType', 'created_at'
+    )
 
     # Apply tax_type filter if provided
     tax_type = request.query_params.get('tax_type')
@@ -507,7 +659,7 @@ def tds_tcs_list_view(request, org_id):
     # Fallback if pagination fails
     serializer = ZohoTdsTcsSerializer(tds_tcs, many=True)
     return Response({
-        "count": tds_tcs.count(),
+        "count": len(serializer.data),
         "next": None,
         "previous": None,
         "results": serializer.data
@@ -529,70 +681,14 @@ def tds_tcs_sync_view(request, org_id):
 
     try:
         credentials = get_zoho_credentials(organization)
-
-        synced_count = 0
-
-        # Fetch TDS taxes
-        tds_data = make_zoho_api_request(credentials, "settings/taxes?is_tds_request=true")
-
-        tds_taxes = tds_data.get('taxes', [])
-
-        # Get existing TDS tax IDs to avoid duplicates
-        existing_tds_taxes = ZohoTdsTcs.objects.filter(
-            taxId__in=[tax["tax_id"] for tax in tds_taxes],
-            taxType="TDS",
-            organization=organization
-        ).values_list('taxId', flat=True)
-
-        # Create new TDS taxes
-        new_tds_taxes = []
-        for tax in tds_taxes:
-            if tax["tax_id"] not in existing_tds_taxes:
-                new_tds_taxes.append(ZohoTdsTcs(
-                    taxId=tax["tax_id"],
-                    taxName=tax["tax_name"],
-                    taxPercentage=tax.get("tax_percentage", 0),
-                    taxType="TDS",
-                    organization=organization
-                ))
-
-        # Fetch TCS taxes
-        tcs_data = make_zoho_api_request(credentials, "settings/taxes?is_tcs_request=true&filter_by=Taxes.All")
-        tcs_taxes = tcs_data.get('taxes', [])
-
-        # Get existing TCS tax IDs to avoid duplicates
-        existing_tcs_taxes = ZohoTdsTcs.objects.filter(
-            taxId__in=[tax["tax_id"] for tax in tcs_taxes],
-            taxType="TCS",
-            organization=organization
-        ).values_list('taxId', flat=True)
-
-        # Create new TCS taxes
-        new_tcs_taxes = []
-        for tax in tcs_taxes:
-            if tax["tax_id"] not in existing_tcs_taxes:
-                new_tcs_taxes.append(ZohoTdsTcs(
-                    taxId=tax["tax_id"],
-                    taxName=tax["tax_name"],
-                    taxPercentage=tax.get("tax_percentage", 0),
-                    taxType="TCS",
-                    organization=organization
-                ))
-
-        # Bulk create new taxes
-        if new_tds_taxes:
-            ZohoTdsTcs.objects.bulk_create(new_tds_taxes)
-            synced_count += len(new_tds_taxes)
-
-        if new_tcs_taxes:
-            ZohoTdsTcs.objects.bulk_create(new_tcs_taxes)
-            synced_count += len(new_tcs_taxes)
+        tds_count, tcs_count = sync_zoho_tds_tcs(organization, credentials)
+        synced_count = tds_count + tcs_count
 
         return Response({
             "detail": f"Successfully synced {synced_count} TDS/TCS taxes",
             "synced_count": synced_count,
-            "tds_count": len(new_tds_taxes),
-            "tcs_count": len(new_tcs_taxes)
+            "tds_count": tds_count,
+            "tcs_count": tcs_count
         })
 
     except Exception as e:
@@ -601,3 +697,55 @@ def tds_tcs_sync_view(request, org_id):
             {"detail": f"Sync failed: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+def _run_zoho_sync(sync, organization, credentials):
+    """Run one settings sync on a worker thread and report its outcome."""
+    try:
+        return {"status": "synced", "synced_count": sync(organization, credentials)}
+    except Exception as e:
+        logger.error(f"Zoho sync failed: {str(e)}")
+        return {"status": "error", "detail": f"Sync failed: {str(e)}"}
+    finally:
+        # Worker threads hold their own DB connection; hand it back after each job
+        connection.close()
+
+
+@extend_schema(
+    responses={"200": {"detail": "Zoho settings synced successfully"}},
+    tags=["Zoho Ops"],
+    methods=["POST"]
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def zoho_full_sync_view(request, org_id):
+    """
+    Sync vendors, chart of accounts, taxes and TDS/TCS from Zoho Books in one call.
+    The syncs are independent, so they run side by side and the call takes about as
+    long as the slowest one.
+    """
+    organization = get_organization_from_request(request, org_id=org_id)
+    if not organization:
+        return Response({"detail": "Organization not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        # Resolved once here so a token refresh cannot race between the workers
+        credentials = get_zoho_credentials(organization)
+    except Exception as e:
+        return Response(
+            {"detail": f"Sync failed: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    with ThreadPoolExecutor(max_workers=len(_ZOHO_FULL_SYNC)) as executor:
+        futures = {
+            name: executor.submit(_run_zoho_sync, sync, organization, credentials)
+            for name, sync in _ZOHO_FULL_SYNC
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    failed = [name for name, result in results.items() if result["status"] == "error"]
+    return Response({
+        "detail": f"Sync failed for: {', '.join(failed)}" if failed else "Zoho settings synced successfully",
+        "results": results
+    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR if failed else status.HTTP_200_OK)
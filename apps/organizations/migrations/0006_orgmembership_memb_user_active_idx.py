@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2025-11-10 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0005_organizationapikey_api_key_value_gen'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orgmembership',
+            index=models.Index(fields=['user', 'is_active'], name='memb_user_active_idx'),
+        ),
+    ]
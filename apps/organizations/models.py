@@ -1,7 +1,9 @@
+import hashlib
 import random
 import string
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
@@ -60,6 +62,35 @@ class Organization(TimeStampedModel):
     def __str__(self):  # pragma: no cover
         return f"{self.name} ({self.unique_name})"
 
+    CACHE_TIMEOUT = 5 * 60
+
+    @classmethod
+    def cached(cls, org_id):
+        """
+        Return the Organization with this id, or None.
+        Hits are cached across requests and invalidated when the organization changes.
+        """
+        cache_key = _organization_cache_key(org_id)
+        organization = cache.get(cache_key)
+        if organization is None:
+            organization = cls.objects.filter(id=org_id).first()
+            if organization is not None:
+                cache.set(cache_key, organization, cls.CACHE_TIMEOUT)
+        return organization
+
+
+def _organization_cache_key(org_id) -> str:
+    return f"organization:{org_id}"
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_organization_cache(sender, instance: "Organization", **kwargs):
+    """
+    Drop the cached Organization whenever it is saved or deleted.
+    """
+    cache.delete(_organization_cache_key(instance.pk))
+
 
 class OrgMembership(TimeStampedModel):
     ADMIN = "ADMIN"
@@ -80,6 +111,9 @@ class OrgMembership(TimeStampedModel):
     class Meta:
         unique_together = ("organization", "user")
         ordering = ("organization_id", "-id")
+        indexes = [
+            models.Index(fields=["user", "is_active"], name="memb_user_active_idx"),
+        ]
 
     def __str__(self):  # pragma: no cover
         return f"{self.user_id} in {self.organization_id} ({self.role})"
@@ -99,6 +133,49 @@ class OrganizationAPIKey(TimeStampedModel):
     def __str__(self):  # pragma: no cover
         return f"{self.organization.name} · {self.name}"
 
+    ORGANIZATION_CACHE_TIMEOUT = 60
+
+    @classmethod
+    def organization_for_key(cls, api_key):
+        """
+        Return the Organization linked to an API key (APIKey instance or key id), or None.
+        Results, including misses, are cached briefly and invalidated when the link changes.
+        """
+        cache_key = _api_key_cache_key(getattr(api_key, "pk", api_key))
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached or None
+
+        org_api_key = cls.objects.select_related("organization").filter(api_key=api_key).first()
+        organization = org_api_key.organization if org_api_key else None
+        cache.set(cache_key, organization or "", cls.ORGANIZATION_CACHE_TIMEOUT)
+        return organization
+
+
+def _api_key_cache_key(api_key_id) -> str:
+    digest = hashlib.blake2b(str(api_key_id).encode("utf-8"), digest_size=16).hexdigest()
+    return f"org_api_key:{digest}"
+
+
+@receiver(post_save, sender=OrganizationAPIKey)
+@receiver(post_delete, sender=OrganizationAPIKey)
+def invalidate_api_key_cache(sender, instance: "OrganizationAPIKey", **kwargs):
+    """
+    Drop the cached organization for an API key whenever its link changes.
+    """
+    cache.delete(_api_key_cache_key(instance.api_key_id))
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_api_key_cache_for_organization(sender, instance: "Organization", created, **kwargs):
+    """
+    Cached API key lookups hold the Organization itself, so refresh them when it changes.
+    """
+    if created:
+        return
+    api_key_ids = OrganizationAPIKey.objects.filter(organization=instance).values_list("api_key_id", flat=True)
+    cache.delete_many([_api_key_cache_key(api_key_id) for api_key_id in api_key_ids])
+
 
 # ---------- Modules & Entitlements ----------
 
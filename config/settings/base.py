@@ -98,6 +98,16 @@ DATABASES = {
     )
 }
 
+# Pool PostgreSQL connections with psycopg_pool instead of opening one per request.
+# The pool owns connection lifetime, so persistent connections must stay disabled.
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql" and env.bool("DB_POOL", default=True):
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": env.int("DB_POOL_MIN_SIZE", default=4),
+        "max_size": env.int("DB_POOL_MAX_SIZE", default=20),
+        "timeout": env.int("DB_POOL_TIMEOUT", default=10),
+    }
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+
 # ------------------------------------------------------------
 # Templates
 # ------------------------------------------------------------